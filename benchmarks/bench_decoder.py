@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from simulator.bybit_decoder import decode_levels, level_pairs, loads  # noqa: E402
+from simulator.orderbook import Orderbook  # noqa: E402
+from simulator.recorder import read_recording  # noqa: E402
+
+# Orderbook decode + apply throughput, before (json + per-level tuples) and after
+# (bybit_decoder). Frames come from a Recorder capture, re-serialized as compact
+# JSON like on the wire, or are generated synthetically.
+
+
+def recorded_frames(path: str) -> list[bytes]:
+    return [json.dumps(data, separators=(",", ":")).encode()
+            for _, channel, data in read_recording(path) if channel == "orderbook"]
+
+
+def synthetic_frames(count: int, depth: int, seed: int = 0) -> list[bytes]:
+    rnd = random.Random(seed)
+
+    def levels(sign: int, n: int):
+        return [[f"{30000 + sign * (0.1 + 0.1 * rnd.randrange(depth)):.1f}", f"{rnd.choice([0, rnd.random()]):.3f}"]
+                for _ in range(n)]
+
+    snapshot = {"topic": "orderbook.%d.BTCUSDT" % depth, "type": "snapshot", "ts": 0,
+                "data": {"s": "BTCUSDT", "b": [[f"{30000 - 0.1 * (i + 1):.1f}", "1.000"] for i in range(depth)],
+                         "a": [[f"{30000 + 0.1 * (i + 1):.1f}", "1.000"] for i in range(depth)], "u": 0, "seq": 0}}
+    frames = [json.dumps(snapshot, separators=(",", ":")).encode()]
+    for i in range(1, count):
+        delta = {"topic": "orderbook.%d.BTCUSDT" % depth, "type": "delta", "ts": i,
+                 "data": {"s": "BTCUSDT", "b": levels(-1, rnd.randint(1, 20)), "a": levels(1, rnd.randint(1, 20)),
+                          "u": i, "seq": i}}
+        frames.append(json.dumps(delta, separators=(",", ":")).encode())
+    return frames
+
+
+def before(frames: list[bytes]):
+    orderbook = Orderbook("BTCUSDT")
+    for frame in frames:
+        data = json.loads(frame)
+        bids = map(lambda x: (float(x[0]), float(x[1])), data["data"]["b"])
+        asks = map(lambda x: (float(x[0]), float(x[1])), data["data"]["a"])
+        if data["type"] == "snapshot":
+            orderbook.update(bids, asks, data["ts"] / 1000)
+        else:
+            orderbook.delta_update(bids, asks, data["ts"] / 1000)
+    return orderbook
+
+
+def after(frames: list[bytes]):
+    orderbook = Orderbook("BTCUSDT")
+    for frame in frames:
+        data = loads(frame)
+        book = data["data"]
+        bids = level_pairs(decode_levels(book["b"]))
+        asks = level_pairs(decode_levels(book["a"]))
+        if data["type"] == "snapshot":
+            orderbook.update(bids, asks, data["ts"] / 1000)
+        else:
+            orderbook.delta_update(bids, asks, data["ts"] / 1000)
+    return orderbook
+
+
+def decode_before(frames: list[bytes]):
+    for frame in frames:
+        data = json.loads(frame)
+        list(map(lambda x: (float(x[0]), float(x[1])), data["data"]["b"]))
+        list(map(lambda x: (float(x[0]), float(x[1])), data["data"]["a"]))
+
+
+def decode_after(frames: list[bytes]):
+    for frame in frames:
+        book = loads(frame)["data"]
+        decode_levels(book["b"])
+        decode_levels(book["a"])
+
+
+def throughput(function, frames: list[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(frames)
+        best = min(best, time.perf_counter() - started)
+    return len(frames) / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Orderbook decode + apply throughput, before and after bybit_decoder")
+    parser.add_argument("recording", nargs="?", help="Recorder capture (.jsonl.gz); synthetic frames if omitted")
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = recorded_frames(args.recording) if args.recording else synthetic_frames(args.count, args.depth)
+    assert before(frames).bids == after(frames).bids
+    print(f"{len(frames)} orderbook messages")
+    for name, old_path, new_path in (("decode", decode_before, decode_after), ("decode + apply", before, after)):
+        old = throughput(old_path, frames, args.repeat)
+        new = throughput(new_path, frames, args.repeat)
+        print(f"{name:15} before: {old:10,.0f} msgs/s  after: {new:10,.0f} msgs/s ({new / old:.2f}x)")
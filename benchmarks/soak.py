@@ -0,0 +1,151 @@
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from simulator.abstract_strategy import AbstractStrategy  # noqa: E402
+from simulator.bybit_handler import BybitHandler  # noqa: E402
+from simulator.bybit_decoder import topic_symbol  # noqa: E402
+from simulator.latency import EXCHANGE_TO_RECEIVE, LatencyMonitor  # noqa: E402
+from simulator.local_bybit import CaptureFeed  # noqa: E402
+from simulator.transport import LocalTransport  # noqa: E402
+
+# Soak/load test of the live path against the local Bybit stand-in
+# (simulator/local_bybit.py), run in its own process at increasing message
+# rates. For each rate, reports the rate the server actually sent (from its
+# stats lines), the rate the handler processed and the send-to-callback latency.
+# The handler is behind when it processes less than --keep-up of what was sent,
+# or when the server could not send the requested rate because it was blocked
+# on the socket (the handler not reading fast enough). When the server falls
+# short without being blocked, the rate was not offered and the run is marked
+# SERVER LIMITED instead.
+
+_BLOCKED = 0.5  # share of the time the server spent blocked on the socket above which a short send is the handler's
+
+
+class _Counter(AbstractStrategy):
+    def __init__(self, exchange_handlers, latency):
+        super().__init__(exchange_handlers=exchange_handlers, latency=latency)
+        self.events = 0
+
+    def on_orderbook_update(self, *args):
+        self.events += 1
+
+    def on_trade(self, *args):
+        self.events += 1
+
+    def on_candle_update(self, *args):
+        self.events += 1
+
+    def on_liquidation(self, *args):
+        self.events += 1
+
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"local Bybit server did not start on port {port}")
+
+
+def _read_stats(stream, samples: list):
+    # collects the server's 'stats {...}' lines as (time, sent, send_wait)
+    for line in stream:
+        if line.startswith("stats "):
+            stats = json.loads(line[6:])
+            samples.append((stats["time"], stats["sent"], stats["send_wait"]))
+
+
+def _sent_rate(samples: list, start: float, end: float) -> tuple[float, float]:
+    # (frames sent per second, share of the time blocked on the socket) between start and end
+    window = [sample for sample in samples if start <= sample[0] <= end]
+    if len(window) < 2:
+        return 0.0, 0.0
+    (first_time, first_sent, first_wait), (last_time, last_sent, last_wait) = window[0], window[-1]
+    elapsed = last_time - first_time
+    return (last_sent - first_sent) / elapsed, (last_wait - first_wait) / elapsed
+
+
+def soak(rate: float, symbols: list[str], duration: float, port: int, capture: list[str] = None, depth: int = 50) -> dict:
+    command = [sys.executable, "-m", "simulator.local_bybit", "--port", str(port), "--rate", str(rate),
+               "--depth", str(depth), "--stats-interval", "0.1"]
+    if capture:
+        command += ["--capture", *capture]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    samples = []
+    threading.Thread(target=_read_stats, args=(server.stdout, samples), daemon=True).start()
+    try:
+        _wait_for_port(port)
+        transport = LocalTransport(f"ws://127.0.0.1:{port}/v5/public/linear")
+        latency = LatencyMonitor()
+        handler = BybitHandler(None, None, set(symbols), orderbook_depth=depth, kline_intervals={}, transport=transport)
+        strategy = _Counter({"Bybit": handler}, latency)
+        strategy.start()
+        time.sleep(2.0)  # warm up, the server encodes its frame pool meanwhile
+        events, started, start = strategy.events, time.perf_counter(), time.time()
+        time.sleep(duration)
+        processed = (strategy.events - events) / (time.perf_counter() - started)
+        sent, send_wait = _sent_rate(samples, start, time.time())
+        transport.exit()
+    finally:
+        server.terminate()
+        server.wait()
+
+    histograms = [latency.histogram(EXCHANGE_TO_RECEIVE, symbol) for symbol in symbols]
+    count = sum(histogram.count for histogram in histograms)
+    return {"rate": rate, "sent": sent, "send_wait": send_wait, "processed": processed,
+            "latency_p50_ms": max(histogram.percentile(50) for histogram in histograms) / 1e6,
+            "latency_p99_ms": max(histogram.percentile(99) for histogram in histograms) / 1e6,
+            "latency_max_ms": max(histogram.max for histogram in histograms) / 1e6,
+            "messages": count}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Soak test BybitHandler against the local Bybit stand-in")
+    parser.add_argument("--rates", default="1000,5000,10000,20000,50000", help="comma-separated msgs/s to offer")
+    parser.add_argument("--symbols", type=int, default=20, help="number of synthetic symbols")
+    parser.add_argument("--depth", type=int, default=50, help="orderbook depth subscribed to (and of synthetic data)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--capture", nargs="*", help="Recorder captures to replay instead of synthetic data")
+    parser.add_argument("--keep-up", type=float, default=0.95, help="processed/sent ratio below which the handler is behind")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    if args.capture:
+        symbols = sorted({topic_symbol(topic) for topic in CaptureFeed(args.capture).topics()})
+    else:
+        symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    results = []
+    for rate in (float(rate) for rate in args.rates.split(",")):
+        result = soak(rate, symbols, args.duration, args.port, args.capture, args.depth)
+        short = result["sent"] < rate * args.keep_up
+        result["behind"] = (result["processed"] < result["sent"] * args.keep_up
+                            or short and result["send_wait"] >= _BLOCKED)
+        result["server_limited"] = short and not result["behind"]
+        results.append(result)
+        status = "  BEHIND" if result["behind"] else "  SERVER LIMITED" if result["server_limited"] else ""
+        print(f"offered {rate:10,.0f} msgs/s  sent {result['sent']:10,.0f} msgs/s  processed {result['processed']:10,.0f} msgs/s  "
+              f"latency p50 {result['latency_p50_ms']:8.2f} ms  p99 {result['latency_p99_ms']:8.2f} ms{status}", flush=True)
+
+    sustained = [result["rate"] for result in results if not result["behind"] and not result["server_limited"]]
+    print(f"highest sustained rate: {max(sustained):,.0f} msgs/s" if sustained else "no rate was both offered and sustained")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
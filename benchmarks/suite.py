@@ -0,0 +1,270 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from simulator.abstract_strategy import AbstractStrategy  # noqa: E402
+from simulator.exchange_handler import ExchangeHandler  # noqa: E402
+from simulator.fill_model import CrossFillModel, QueueFillModel  # noqa: E402
+from simulator.orderbook import Orderbook  # noqa: E402
+from simulator.recorder import Recorder  # noqa: E402
+from simulator.replay_handler import ReplayHandler, StoreReplayHandler  # noqa: E402
+from simulator.tick_store import convert_recording  # noqa: E402
+
+# Offline benchmarks of the simulator core. Every case runs in a fresh process
+# (for a meaningful peak RSS), on seeded synthetic data unless --recording is
+# given, and reports the best throughput over --repeat runs. Results are saved
+# as JSON; with --baseline, the run fails if a case got slower (or bigger) than
+# the baseline by more than --threshold.
+
+TICK = 0.1
+MID = 30000.0
+
+
+def _book(depth: int) -> Orderbook:
+    orderbook = Orderbook("BTCUSDT")
+    orderbook.update([(MID - TICK * (i + 1), 1.0) for i in range(depth)],
+                     [(MID + TICK * (i + 1), 1.0) for i in range(depth)], 0)
+    return orderbook
+
+
+def _deltas(depth: int, count: int, seed: int = 0) -> list:
+    rnd = random.Random(seed)
+    deltas = []
+    for _ in range(count):
+        bids = [(round(MID - TICK * rnd.randint(1, depth), 1), rnd.choice([0.0, rnd.random()])) for _ in range(rnd.randint(1, 10))]
+        asks = [(round(MID + TICK * rnd.randint(1, depth), 1), rnd.choice([0.0, rnd.random()])) for _ in range(rnd.randint(1, 10))]
+        deltas.append((bids, asks))
+    return deltas
+
+
+def _best_of(repeat: int, function, setup=None) -> float:
+    # best wall time of function(setup()), setup not being timed
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        started = time.perf_counter()
+        function(state) if setup is not None else function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_delta_apply(depth: int, repeat: int, **_) -> tuple[float, str]:
+    deltas = _deltas(depth, 50_000)
+
+    def run():
+        orderbook = _book(depth)
+        for i, (bids, asks) in enumerate(deltas):
+            orderbook.delta_update(bids, asks, i)
+
+    return len(deltas) / _best_of(repeat, run), "deltas/s"
+
+
+def bench_fill_order(repeat: int, **_) -> tuple[float, str]:
+    # market orders sweeping 250 of 500 levels, on a fresh book each time
+    books = 200
+
+    def run(orderbooks):
+        for orderbook in orderbooks:
+            orderbook.fill_order(250.5)
+            orderbook.fill_order(-250.5)
+
+    return 2 * books / _best_of(repeat, run, lambda: [_book(500) for _ in range(books)]), "sweeps/s"
+
+
+class _Handler(ExchangeHandler):
+    def __init__(self):
+        super().__init__(name="Bybit", symbols={"BTCUSDT"})
+
+
+class _Quoter(AbstractStrategy):
+    def __init__(self, exchange_handlers, fill_model):
+        super().__init__(exchange_handlers=exchange_handlers, initial_balance=1e12, fill_model=fill_model)
+
+
+def bench_matching(orders: int, repeat: int, fill_model: type = CrossFillModel, **_) -> tuple[float, str]:
+    # book updates through AbstractStrategy with `orders` resting limit orders,
+    # none of which are crossed (the common case)
+    deltas = _deltas(50, 20_000)
+
+    def setup():
+        handler = _Handler()
+        strategy = _Quoter({"Bybit": handler}, fill_model())
+        handler.start(strategy)
+        orderbook = handler.orderbook("BTCUSDT")
+        orderbook.update(_book(50).top_bids(50), _book(50).top_asks(50), 0)
+        for i in range(orders):
+            strategy.limit_order("BTCUSDT", "Bybit", "Buy", 0.001, round(MID - 10 - TICK * (i % 1000), 1))
+            strategy.limit_order("BTCUSDT", "Bybit", "Sell", 0.001, round(MID + 10 + TICK * (i % 1000), 1))
+        return handler, strategy, orderbook
+
+    def run(state):
+        handler, strategy, orderbook = state
+        for i, (bids, asks) in enumerate(deltas):
+            orderbook.delta_update(bids, asks, i)
+            strategy._on_orderbook_update("BTCUSDT", handler, orderbook, i)
+
+    return len(deltas) / _best_of(repeat, run, setup), "updates/s"
+
+
+def _synthetic_recording(path: str, count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    recorder = Recorder(path)
+    ts = 1_700_000_000_000
+    recorder.record("orderbook", {"topic": "orderbook.200.BTCUSDT", "type": "snapshot", "ts": ts,
+                                  "data": {"s": "BTCUSDT", "b": [[f"{MID - TICK * (i + 1):.1f}", "1.000"] for i in range(200)],
+                                           "a": [[f"{MID + TICK * (i + 1):.1f}", "1.000"] for i in range(200)], "u": 0, "seq": 0}})
+    for i in range(1, count):
+        ts += rnd.randint(1, 20)
+        if rnd.random() < 0.85:
+            bids = [[f"{MID - TICK * rnd.randint(1, 200):.1f}", f"{rnd.choice([0, rnd.random()]):.3f}"] for _ in range(rnd.randint(1, 10))]
+            asks = [[f"{MID + TICK * rnd.randint(1, 200):.1f}", f"{rnd.choice([0, rnd.random()]):.3f}"] for _ in range(rnd.randint(1, 10))]
+            recorder.record("orderbook", {"topic": "orderbook.200.BTCUSDT", "type": "delta", "ts": ts,
+                                          "data": {"s": "BTCUSDT", "b": bids, "a": asks, "u": i, "seq": i}})
+        else:
+            recorder.record("trade", {"topic": "publicTrade.BTCUSDT", "type": "snapshot", "ts": ts,
+                                      "data": [{"T": ts, "s": "BTCUSDT", "S": rnd.choice(["Buy", "Sell"]),
+                                                "v": f"{rnd.random():.3f}", "p": f"{MID:.1f}"}]})
+    recorder.close()
+
+
+class _Counter(AbstractStrategy):
+    def __init__(self, exchange_handlers):
+        super().__init__(exchange_handlers=exchange_handlers)
+        self.events = 0
+
+    def on_orderbook_update(self, *args):
+        self.events += 1
+
+    def on_trade(self, *args):
+        self.events += 1
+
+
+def bench_replay(source: str, repeat: int, recording: str = None, **_) -> tuple[float, str]:
+    workdir = tempfile.mkdtemp()
+    try:
+        if recording is None:
+            recording = os.path.join(workdir, "capture.jsonl.gz")
+            _synthetic_recording(recording, 100_000)
+        if source == "store":
+            convert_recording([recording], os.path.join(workdir, "store"))
+        events = 0
+
+        def run():
+            nonlocal events
+            if source == "store":
+                handler = StoreReplayHandler(os.path.join(workdir, "store"), {"BTCUSDT"})
+            else:
+                handler = ReplayHandler([recording], {"BTCUSDT"})
+            strategy = _Counter({"Bybit": handler})
+            strategy.start()
+            events = strategy.events
+
+        elapsed = _best_of(repeat, run)
+        return events / elapsed, "events/s"
+    finally:
+        shutil.rmtree(workdir)
+
+
+CASES = {
+    "delta_apply_50": (bench_delta_apply, {"depth": 50}),
+    "delta_apply_200": (bench_delta_apply, {"depth": 200}),
+    "delta_apply_500": (bench_delta_apply, {"depth": 500}),
+    "fill_order_deep": (bench_fill_order, {}),
+    "matching_1": (bench_matching, {"orders": 1}),
+    "matching_100": (bench_matching, {"orders": 100}),
+    "matching_10000": (bench_matching, {"orders": 10_000}),
+    "queue_matching_1": (bench_matching, {"orders": 1, "fill_model": QueueFillModel}),
+    "queue_matching_100": (bench_matching, {"orders": 100, "fill_model": QueueFillModel}),
+    "queue_matching_10000": (bench_matching, {"orders": 10_000, "fill_model": QueueFillModel}),
+    "replay_recording": (bench_replay, {"source": "recording"}),
+    "replay_store": (bench_replay, {"source": "store"}),
+}
+
+
+def _run_case(name: str, repeat: int, recording: str) -> dict:
+    function, kwargs = CASES[name]
+    throughput, unit = function(repeat=repeat, recording=recording, **kwargs)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    return {"throughput": throughput, "unit": unit, "peak_rss_mb": peak_rss / 1024}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: {result['throughput']:,.0f} {result['unit']} vs {base['throughput']:,.0f} in baseline")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.1f} MB vs {base['peak_rss_mb']:.1f} MB in baseline")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Simulator core benchmarks")
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recording", help="Recorder capture to use for the replay cases instead of synthetic data")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results JSON of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (default: 0.10)")
+    args = parser.parse_args()
+
+    names = args.cases or list(CASES)
+    for name in names:
+        if name not in CASES:
+            parser.error(f"unknown case {name}")
+    baseline = None
+    if args.baseline:
+        if os.path.abspath(args.baseline) == os.path.abspath(args.output):
+            parser.error("--output must differ from --baseline, the baseline would be overwritten")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = dict()
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(_run_case, (name, args.repeat, args.recording))
+        result = results[name]
+        print(f"{name:20} {result['throughput']:14,.0f} {result['unit']:10} peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "commit": _git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "repeat": args.repeat, "recording": args.recording},
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,103 @@
-import uuid
+from itertools import count
+from time import perf_counter_ns
 
+from .audit import AuditWriter
+from .bars import BarAggregator
+from .conflation import BookConflation
+from .event_clock import EventClock
 from .exchange_handler import ExchangeHandler
+from .fill_model import CrossFillModel
+from .latency import CALLBACK, MATCHING, LatencyMonitor
+from .metrics import MetricsEngine
 from .orderbook import Orderbook
+from .records import Order, OrderStatus, OrderType, Position, Side, TimeInForce
+from .resting_orders import RestingOrders
 
 # (start_ts, end_ts, interval, open, high, low, close, volume, turnover)
 Candle = tuple[str, str, str, float, float, float, float, float, float]
-# (price, size, side, symbol, exchange, order_id, time_in_force, order_status, order_type)
-Order = tuple[float, float, str, str, str, str, str, str, str]
-Position = tuple[float, float, str, str]  # (size, avg_price, symbol, exchange)
 
 
 class AbstractStrategy:
-    def __init__(self, exchange_handlers: dict[str, ExchangeHandler], simulation: bool = True, initial_balance: float = 100):
+    def __init__(self, exchange_handlers: dict[str, ExchangeHandler], simulation: bool = True, initial_balance: float = 100, fill_model: CrossFillModel = None, latency: LatencyMonitor = None, clock: EventClock = None, audit: AuditWriter = None,
+                 maker_fee: float = 0.0, taker_fee: float = 0.0, metrics_interval: float = 60.0):
         self.exchange_handlers = exchange_handlers
         self.simulation = simulation
+        # merges replay handlers' events by exchange time, with optional feed/order latencies
+        self.clock = clock if clock is not None else EventClock()
+        # orders, fills, positions and balances are logged to it (off if None)
+        self.audit = audit
+        # hot path latency instrumentation, shared with the handlers (off if None)
+        self.latency = latency
+        for exchange_handler in self.exchange_handlers.values():
+            exchange_handler.latency = latency
+        # (exchange, symbol) -> (interval_ms, top_of_book) for on_orderbook_update, None matching any exchange/symbol
+        self._book_conflation: dict[tuple[str, str], tuple[float, bool]] = dict()
+        self._book_conflation_state: dict[tuple[str, str], BookConflation] = dict()
+        self._bars: dict[tuple[str, str], list[tuple[str, float]]] = dict()  # same keys as _book_conflation
+        self._bar_state: dict[tuple[str, str], BarAggregator] = dict()
         if simulation:
+            # decides when resting limit orders are filled (see fill_model.py)
+            self.fill_model = fill_model if fill_model is not None else CrossFillModel()
             self.balance: dict[str, float] = dict()  # exchange -> balance
             for exchange in self.exchange_handlers:
                 self.balance[exchange] = initial_balance
-            self._limit_orders: dict[str, dict[str, dict[str, Order]]] = dict()  # exchange -> symbol -> order_id -> Order
+            self._limit_orders: dict[str, dict[str, RestingOrders]] = {exchange: dict() for exchange in self.exchange_handlers}  # exchange -> symbol -> resting orders
 
             # exchange -> symbol -> Position
-            self.positions: dict[str, dict[str, Position]] = dict()
+            self.positions: dict[str, dict[str, Position]] = {exchange: dict() for exchange in self.exchange_handlers}
 
             # exchange -> symbol -> order_id -> Order
-            self.orders: dict[str, dict[str, dict[str, Order]]] = dict()
+            self.orders: dict[str, dict[str, dict[int, Order]]] = {exchange: dict() for exchange in self.exchange_handlers}
+
+            self.fill_count = 0
+            self._order_ids = count(1)
+
+            # fees as a fraction of the notional: maker for resting limit orders, taker otherwise
+            self.maker_fee = maker_fee
+            self.taker_fee = taker_fee
+            # marked-to-market equity, PnL, drawdown, Sharpe and equity curves sampled every metrics_interval seconds
+            self.metrics = MetricsEngine(self.balance, sample_interval=metrics_interval)
+
+    def set_orderbook_conflation(self, symbol: str = None, exchange: str = None, interval_ms: float = None, top_of_book: bool = False):
+        # Limits how often on_orderbook_update is called for a symbol (every symbol
+        # if None): at most once per interval_ms and/or only when the top of book
+        # changed. Orderbooks and simulated fills still process every update.
+        # Calling it without interval_ms and top_of_book turns conflation off.
+        key = (exchange, symbol)
+        if interval_ms is None and not top_of_book:
+            self._book_conflation.pop(key, None)
+        else:
+            self._book_conflation[key] = (interval_ms, top_of_book)
+        self._book_conflation_state.clear()
+
+    def add_bars(self, kind: str, size: float, symbol: str = None, exchange: str = None):
+        # Builds bars of the given type (bars.TIME, TICK, VOLUME or DOLLAR) from the
+        # trades of a symbol (every symbol / exchange if None). Closed bars are sent
+        # to on_candle_update with confirmed=True and interval "<kind>:<size>".
+        self._bars.setdefault((exchange, symbol), []).append((kind, size))
+        self._bar_state.clear()
+
+    def track_orderbook_depth(self, levels: int, symbol: str = None, exchange: str = None):
+        # Keeps running sums of the best `levels` levels of each side on the given
+        # orderbooks (every symbol / exchange if None), so orderbook.imbalance(levels)
+        # and top_depth(levels) are O(1). Other features are lazy and need no setup.
+        for name, exchange_handler in self.exchange_handlers.items():
+            if exchange is None or exchange == name:
+                for book_symbol in exchange_handler.symbols:
+                    if symbol is None or symbol == book_symbol:
+                        exchange_handler.orderbook(book_symbol).track_depth(levels)
 
     def start(self):
         for exchange_handler in self.exchange_handlers.values():
             exchange_handler.start(self)
         self._on_ready()
+        for exchange, exchange_handler in self.exchange_handlers.items():
+            events = exchange_handler.events()
+            if events is None:
+                exchange_handler.run()
+            else:
+                self.clock.add_source(exchange, events)
+        self.clock.run()
 
     # public (i.e. user-defined) callbacks
 
@@ -42,7 +110,7 @@ class AbstractStrategy:
                  side: str, price: float, size: float, timestamp: int): pass
 
     def on_candle_update(self, symbol: str, exchange: ExchangeHandler,
-                         candle: Candle, timestamp: int): pass
+                         candle: Candle, timestamp: int, confirmed: bool): pass
 
     def on_liquidation(self, symbol: str, exchange: ExchangeHandler,
                        side: str, price: float, size: float, timestamp: int): pass
@@ -62,154 +130,289 @@ class AbstractStrategy:
         self.on_ready()
 
     def _on_orderbook_update(self, symbol: str, exchange: ExchangeHandler, orderbook: Orderbook, timestamp: int):
+        latency = self.latency
         # check if any limit orders has been filled
         if self.simulation:
-            if exchange.name in self._limit_orders and symbol in self._limit_orders[exchange.name]:
-                for order_id in self._limit_orders[exchange.name][symbol]:
-                    order = self._limit_orders[exchange.name][symbol][order_id]
-                    # check if order's price has been crossed
-                    if order[2] == "Buy" and order[0] > orderbook.best_bid:
-                        # order is filled
-                        self.balance[exchange.name] -= order[1] * order[0]
-                        if symbol not in self.positions[exchange.name]:
-                            self.positions[exchange.name][symbol] = (
-                                order[1], order[0], symbol, exchange.name)
-                        else:
-                            position = self.positions[exchange.name][symbol]
-                            new_size = position[0] + order[1]
-                            new_avg_price = (
-                                (position[0] * position[1]) + (order[1] * order[0])) / new_size
-                            self.positions[exchange.name][symbol] = (
-                                new_size, new_avg_price, symbol, exchange.name)
-
-                        del self._limit_orders[exchange.name][symbol][order_id]
-                        self.orders[exchange.name][symbol][order_id][7] = "Filled"
-                        self.on_order_filled(symbol, exchange, order, timestamp)
-                    elif order[2] == "Sell" and order[0] < orderbook.best_ask:
-                        # order is filled
-                        self.balance[exchange.name] += order[1] * order[0]
-                        if symbol not in self.positions[exchange.name]:
-                            self.positions[exchange.name][symbol] = (
-                                -order[1], order[0], symbol, exchange.name)
-                        else:
-                            position = self.positions[exchange.name][symbol]
-                            new_size = position[0] - order[1]
-                            new_avg_price = (
-                                (position[0] * position[1]) - (order[1] * order[0])) / new_size
-                            self.positions[exchange.name][symbol] = (
-                                new_size, new_avg_price, symbol, exchange.name)
-
-                        del self._limit_orders[exchange.name][symbol][order_id]
-                        self.orders[exchange.name][symbol][order_id][7] = "Filled"
-                        self.on_order_filled(symbol, exchange, order, timestamp)
-
-        self.on_orderbook_update(symbol, exchange, orderbook, timestamp)
+            resting_orders = self._limit_orders[exchange.name].get(symbol)
+            if resting_orders:
+                if latency is not None:
+                    started = perf_counter_ns()
+                for order in self.fill_model.on_orderbook_update(resting_orders, orderbook):
+                    self._fill_limit_order(symbol, exchange, order, timestamp)
+                if latency is not None:
+                    latency.record(MATCHING, symbol, perf_counter_ns() - started)
+            if orderbook.best_bid is not None and orderbook.best_ask is not None:
+                self.metrics.on_mark(exchange.name, symbol, (orderbook.best_bid + orderbook.best_ask) / 2, timestamp)
+
+        if self._bars:
+            for candle in self._symbol_bars(symbol, exchange.name).advance(timestamp):
+                self._on_candle_update(symbol, exchange, candle, timestamp, confirmed=True)
+
+        if self._book_conflation and not self._should_notify(symbol, exchange.name, orderbook, timestamp):
+            return
+        if latency is None:
+            self.on_orderbook_update(symbol, exchange, orderbook, timestamp)
+        else:
+            started = perf_counter_ns()
+            self.on_orderbook_update(symbol, exchange, orderbook, timestamp)
+            latency.record(CALLBACK, symbol, perf_counter_ns() - started)
+
+    def _should_notify(self, symbol: str, exchange: str, orderbook: Orderbook, timestamp: int) -> bool:
+        conflation = self._book_conflation_state.get((exchange, symbol))
+        if conflation is None:
+            # the most specific setting applies, each symbol keeping its own state
+            for key in ((exchange, symbol), (None, symbol), (exchange, None), (None, None)):
+                if key in self._book_conflation:
+                    conflation = BookConflation(*self._book_conflation[key])
+                    break
+            else:
+                conflation = BookConflation()
+            self._book_conflation_state[(exchange, symbol)] = conflation
+        return conflation.should_notify(orderbook, timestamp)
 
     def _on_trade(self, symbol: str, exchange: ExchangeHandler, side: str, price: float, size: float, timestamp: int):
-        self.on_trade(symbol, exchange, side, price, size, timestamp)
+        if self.simulation:
+            resting_orders = self._limit_orders[exchange.name].get(symbol)
+            if resting_orders:
+                for order in self.fill_model.on_trade(resting_orders, side, price, size):
+                    self._fill_limit_order(symbol, exchange, order, timestamp)
 
-    def _on_candle_update(self, symbol: str, exchange: ExchangeHandler, candle: Candle, timestamp: int):
-        self.on_candle_update(symbol, exchange, candle, timestamp)
+        if self.latency is None:
+            self.on_trade(symbol, exchange, side, price, size, timestamp)
+        else:
+            started = perf_counter_ns()
+            self.on_trade(symbol, exchange, side, price, size, timestamp)
+            self.latency.record(CALLBACK, symbol, perf_counter_ns() - started)
+
+        if self._bars:
+            for candle in self._symbol_bars(symbol, exchange.name).on_trade(price, size, timestamp):
+                self._on_candle_update(symbol, exchange, candle, timestamp, confirmed=True)
+
+    def _symbol_bars(self, symbol: str, exchange: str) -> BarAggregator:
+        bars = self._bar_state.get((exchange, symbol))
+        if bars is None:
+            specs = []
+            for key in ((exchange, symbol), (None, symbol), (exchange, None), (None, None)):
+                specs += self._bars.get(key, [])
+            bars = self._bar_state[(exchange, symbol)] = BarAggregator(specs)
+        return bars
+
+    def _on_candle_update(self, symbol: str, exchange: ExchangeHandler, candle: Candle, timestamp: int, confirmed: bool):
+        self.on_candle_update(symbol, exchange, candle, timestamp, confirmed)
 
     def _on_liquidation(self, symbol: str, exchange: ExchangeHandler, side: str, price: float, size: float, timestamp: int):
         self.on_liquidation(symbol, exchange, side, price, size, timestamp)
 
+    # simulated fills
+
+    def _fill_limit_order(self, symbol: str, exchange: ExchangeHandler, order: Order, timestamp: int):
+        # resting limit orders are filled at their limit price
+        order.status = OrderStatus.FILLED
+        if self.audit is not None:
+            self._audit_order(order)
+        self._apply_fill(symbol, exchange.name, order.side, order.size, order.price, timestamp, self.maker_fee)
+        self.on_order_filled(symbol, exchange, order, timestamp)
+
+    def _apply_fill(self, symbol: str, exchange: str, side: Side, size: float, price: float, timestamp: int, fee_rate: float):
+        signed_size = side * size
+        fee = size * price * fee_rate
+        self.balance[exchange] -= signed_size * price + fee
+
+        positions = self.positions[exchange]
+        position = positions.get(symbol)
+        if position is None:
+            position = positions[symbol] = Position(signed_size, price, symbol, exchange)
+        elif position.size == 0:
+            position.size = signed_size
+            position.avg_price = price
+        else:
+            new_size = position.size + signed_size
+            if position.size * signed_size > 0:  # increasing the position
+                position.avg_price = ((position.size * position.avg_price) + (signed_size * price)) / new_size
+            elif position.size * new_size < 0:  # position flipped sides
+                position.avg_price = price
+            position.size = new_size
+        self.fill_count += 1
+        self.metrics.on_fill(exchange, symbol, signed_size, price, fee, self.balance[exchange], timestamp)
+        if self.audit is not None:
+            self.audit.record("fill", {"symbol": symbol, "exchange": exchange, "side": side.name, "size": size,
+                                       "price": price, "fee": fee, "ts": timestamp})
+            self.audit.record("position", {"symbol": symbol, "exchange": exchange, "size": position.size,
+                                           "avg_price": position.avg_price, "ts": timestamp})
+            self.audit.record("balance", {"exchange": exchange, "balance": self.balance[exchange], "ts": timestamp})
+
+        exchange_handler = self.exchange_handlers[exchange]
+        self.on_position_change(symbol, exchange_handler, position, timestamp)
+        self.on_balance_change(exchange_handler, self.balance[exchange], timestamp)
+
+    def _resting_orders(self, symbol: str, exchange: str) -> RestingOrders:
+        if symbol not in self._limit_orders[exchange]:
+            self._limit_orders[exchange][symbol] = RestingOrders()
+        return self._limit_orders[exchange][symbol]
+
+    def _symbol_orders(self, symbol: str, exchange: str) -> dict[int, Order]:
+        if symbol not in self.orders[exchange]:
+            self.orders[exchange][symbol] = dict()
+        return self.orders[exchange][symbol]
+
+    def _audit_order(self, order: Order):
+        # logged whenever an order rests, fills or is cancelled
+        orderbook = self.exchange_handlers[order.exchange].orderbook(order.symbol)
+        self.audit.record("order", {"order_id": order.order_id, "symbol": order.symbol, "exchange": order.exchange,
+                                    "side": order.side.name, "type": order.order_type.name, "price": order.price,
+                                    "size": order.size, "time_in_force": order.time_in_force.name,
+                                    "status": order.status.name, "ts": orderbook.last_update_time})
+
     # action methods
+    # side and time_in_force accept the enums from records.py or Bybit's strings ("Buy", "GTC", ...)
+
+    # With an order latency for the exchange on the strategy's clock (replay only),
+    # orders and cancels are returned right away but only reach the book after the
+    # delay: orders stay NEW until then, and an order that can't be filled or
+    # would cross with post_only is CANCELLED instead of returning None.
+
+    def _order_delay(self, exchange: str) -> float:
+        return self.clock.order_latency.get(exchange, 0) if self.clock.now is not None else 0
 
-    def market_order(self, symbol: str, exchange: str, side: str, size: float, reduce_only: bool = False, time_in_force: str = "GTC"):
+    def market_order(self, symbol: str, exchange: str, side: Side, size: float, reduce_only: bool = False, time_in_force: TimeInForce = "GTC") -> Order:
         if self.simulation:
-            if side == "Buy":
-                if reduce_only and exchange in self.positions and symbol in self.positions[exchange] and self.positions[exchange][symbol] > 0:
-                    return None
-                elif reduce_only and exchange in self.positions and symbol in self.positions[exchange] and self.positions[exchange][symbol] < 0 and self.positions[exchange][symbol] > -size:
-                    # ensures that the order will reduce the position to 0
-                    size = -self.positions[exchange][symbol]
-
-                if self.balance >= size:
-                    self.balance[exchange] -= size
-                    fill_price = self.exchange_handlers[exchange].orderbook(
-                        symbol).fill_order(size=size)
-                    if symbol not in self.positions[exchange]:
-                        self.positions[exchange][symbol] = (
-                            size, fill_price, symbol, exchange)
-                    else:
-                        position = self.positions[exchange][symbol]
-                        new_size = position[0] + size
-                        new_avg_price = (
-                            (position[0] * position[1]) + (size * fill_price)) / new_size
-                        self.positions[exchange][symbol] = (
-                            new_size, new_avg_price, symbol, exchange)
-
-                    order = (fill_price, size, side, symbol, exchange, str(
-                        uuid.uuid4()), time_in_force, "Filled", "Market")
-                    return order
-                else:
-                    return None  # None indicates order could not be filled
-            elif side == "Sell":
-                # position can be negative if shorting
-                if reduce_only and exchange in self.positions and symbol in self.positions[exchange] and self.positions[exchange][symbol] < 0:
-                    return None
-                elif reduce_only and exchange in self.positions and symbol in self.positions[exchange] and self.positions[exchange][symbol] > 0 and self.positions[exchange][symbol] < size:
-                    size = self.positions[exchange][symbol]
-
-                if self.balance >= size:
-                    self.balance[exchange] += size
-                    fill_price = self.exchange_handlers[exchange].orderbook(
-                        symbol).fill_order(size=-size)
-                    if symbol not in self.positions[exchange]:
-                        self.positions[exchange][symbol] = (
-                            -size, fill_price, symbol, exchange)
-                    else:
-                        position = self.positions[exchange][symbol]
-                        new_size = position[0] - size
-                        new_avg_price = (
-                            (position[0] * position[1]) + (size * fill_price)) / new_size
-                        self.positions[exchange][symbol] = (
-                            new_size, new_avg_price, symbol, exchange)
-
-                    order = (fill_price, size, side, symbol, exchange, str(
-                        uuid.uuid4()), time_in_force, "Filled", "Market")
-                    return order
+            order = Order(None, size, Side.parse(side), symbol, exchange, next(self._order_ids),
+                          TimeInForce.parse(time_in_force), OrderStatus.NEW, OrderType.MARKET)
+            delay = self._order_delay(exchange)
+            if delay:
+                self._symbol_orders(symbol, exchange)[order.order_id] = order
+                self.clock.schedule(self.clock.now + delay, self._execute_market_order, order, reduce_only)
+                return order
+            return self._execute_market_order(order, reduce_only)
         else:
             pass
 
-    def limit_order(self, symbol: str, exchange: str, side: str, size: float, price: float, post_only: bool = False, reduce_only: bool = False, time_in_force: str = "GTC"):
+    def _execute_market_order(self, order: Order, reduce_only: bool) -> Order:
+        symbol, exchange, side, size = order.symbol, order.exchange, order.side, order.size
+        if reduce_only:
+            # ensures that the order will at most reduce the position to 0
+            position = self.positions[exchange].get(symbol)
+            size = min(size, -side * position.size if position is not None else 0)
+            if size <= 0:
+                order.status = OrderStatus.CANCELLED
+                if self.audit is not None:
+                    self._audit_order(order)
+                return None
+
+        orderbook = self.exchange_handlers[exchange].orderbook(symbol)
+        reference_price = orderbook.best_ask if side == Side.BUY else orderbook.best_bid
+        if reference_price is None or self.balance[exchange] < size * reference_price:
+            order.status = OrderStatus.CANCELLED
+            if self.audit is not None:
+                self._audit_order(order)
+            return None  # None indicates order could not be filled
+
+        # market orders are IOC: whatever the book can't fill is cancelled, and the
+        # order keeps the filled size
+        with orderbook.lock:
+            fill_price, size = orderbook.take_liquidity(size=side * size)
+        if size <= 0:
+            order.status = OrderStatus.CANCELLED
+            if self.audit is not None:
+                self._audit_order(order)
+            return None
+        order.price = fill_price
+        order.size = size
+        order.status = OrderStatus.FILLED
+        self._symbol_orders(symbol, exchange)[order.order_id] = order
+        if self.audit is not None:
+            self._audit_order(order)
+        self._apply_fill(symbol, exchange, side, size, order.price, orderbook.last_update_time, self.taker_fee)
+        return order
+
+    def limit_order(self, symbol: str, exchange: str, side: Side, size: float, price: float, post_only: bool = False, reduce_only: bool = False, time_in_force: TimeInForce = "GTC") -> Order:
         if self.simulation:
-            # see if the order can be filled immediately
-            # we do a little simplification here by assuming the market order will be filled at a better (or equal) price than the limit order's
-            if side == "Buy" and price >= self.exchange_handlers[exchange].orderbook(symbol).best_ask and not post_only:
-                return self.market_order(symbol, exchange, side, size, reduce_only, time_in_force)
-            elif side == "Sell" and price <= self.exchange_handlers[exchange].orderbook(symbol).best_bid and not post_only:
-                return self.market_order(symbol, exchange, side, size, reduce_only, time_in_force)
-            else:
-                order = (price, size, side, symbol, exchange, str(uuid.uuid4()), time_in_force, "New", "Limit")
-                self._limit_orders[exchange][symbol].append(order)
-                self.orders[exchange][symbol][order[5]] = order
+            time_in_force = TimeInForce.parse(time_in_force)
+            post_only = post_only or time_in_force == TimeInForce.POST_ONLY
+            order = Order(price, size, Side.parse(side), symbol, exchange, next(self._order_ids),
+                          time_in_force, OrderStatus.NEW, OrderType.LIMIT)
+            delay = self._order_delay(exchange)
+            if delay:
+                self._symbol_orders(symbol, exchange)[order.order_id] = order
+                self.clock.schedule(self.clock.now + delay, self._place_limit_order, order, post_only, reduce_only)
                 return order
+            return self._place_limit_order(order, post_only, reduce_only)
         else:
             pass
 
-    def cancel_order(self, symbol: str, exchange: str, order_id: str):
+    def _place_limit_order(self, order: Order, post_only: bool, reduce_only: bool) -> Order:
+        symbol, exchange, side, price = order.symbol, order.exchange, order.side, order.price
+        if order.status != OrderStatus.NEW:
+            return None  # cancelled before it reached the exchange
+        # see if the order can be filled immediately
+        # we do a little simplification here by assuming the market order will be filled at a better (or equal) price than the limit order's
+        orderbook = self.exchange_handlers[exchange].orderbook(symbol)
+        if ((side == Side.BUY and orderbook.best_ask is not None and price >= orderbook.best_ask) or
+                (side == Side.SELL and orderbook.best_bid is not None and price <= orderbook.best_bid)):
+            if post_only:
+                order.status = OrderStatus.CANCELLED
+                if self.audit is not None:
+                    self._audit_order(order)
+                return None
+            order.order_type = OrderType.MARKET
+            return self._execute_market_order(order, reduce_only)
+        resting_orders = self._resting_orders(symbol, exchange)
+        resting_orders.add(order)
+        self.fill_model.on_order_added(resting_orders, order, orderbook)
+        self._symbol_orders(symbol, exchange)[order.order_id] = order
+        if self.audit is not None:
+            self._audit_order(order)
+        return order
+
+    def cancel_order(self, symbol: str, exchange: str, order_id: int) -> Order:
         if self.simulation:
-            pass
+            delay = self._order_delay(exchange)
+            if delay:
+                order = self._symbol_orders(symbol, exchange).get(order_id)
+                if order is None or order.status != OrderStatus.NEW:
+                    return None
+                self.clock.schedule(self.clock.now + delay, self._cancel_order, symbol, exchange, order_id)
+                return order
+            return self._cancel_order(symbol, exchange, order_id)
         else:
             pass
 
-    def cancel_all_orders(self, symbol: str, exchange: str):
+    def _cancel_order(self, symbol: str, exchange: str, order_id: int) -> Order:
+        order = self._resting_orders(symbol, exchange).remove(order_id)
+        if order is None:
+            return None  # None indicates the order was not open
+        order.status = OrderStatus.CANCELLED
+        if self.audit is not None:
+            self._audit_order(order)
+        return order
+
+    def cancel_all_orders(self, symbol: str, exchange: str) -> list[Order]:
         if self.simulation:
-            pass
+            delay = self._order_delay(exchange)
+            if delay:
+                self.clock.schedule(self.clock.now + delay, self._cancel_all_orders, symbol, exchange)
+                return list(self._resting_orders(symbol, exchange).orders.values())
+            return self._cancel_all_orders(symbol, exchange)
         else:
             pass
 
-    def get_order(self, symbol: str, exchange: str, order_id: str):
+    def _cancel_all_orders(self, symbol: str, exchange: str) -> list[Order]:
+        cancelled = self._resting_orders(symbol, exchange).clear()
+        for order in cancelled:
+            order.status = OrderStatus.CANCELLED
+            if self.audit is not None:
+                self._audit_order(order)
+        return cancelled
+
+    def get_order(self, symbol: str, exchange: str, order_id: int) -> Order:
         if self.simulation:
             return self.orders[exchange][symbol][order_id]
         else:
             pass
 
-    def get_orders(self, symbol: str, exchange: str) -> list[tuple[str, str, str, str, float, float]]:
+    def get_orders(self, symbol: str, exchange: str) -> list[Order]:
         if self.simulation:
-            return list(self.orders[exchange][symbol].values())
+            return list(self.orders[exchange].get(symbol, {}).values())
         else:
             pass
 
@@ -227,7 +430,7 @@ class AbstractStrategy:
 
     def get_equity(self, exchange: str):
         if self.simulation:
-            return self.balance[exchange] + sum([position[0] * position[1] for position in self.positions[exchange].values()])
+            return self.metrics.equity(exchange)  # balance + positions marked to mid
         else:
             pass
 
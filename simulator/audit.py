@@ -0,0 +1,121 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class AuditWriter:
+    # Persists audit events (orders, fills, positions, balances, liquidations...)
+    # without doing any I/O on the caller's thread: record() appends to a bounded
+    # in-memory buffer and a background thread serializes and writes batches to
+    # gzip-compressed JSON lines files, in the same [time_ns, kind, data] format
+    # as recordings (so recorder.read_recording reads them too).
+    #
+    # Files are named <name>-<UTC start time>-<n>.jsonl.gz in `directory` and
+    # rotated once max_bytes of JSON have been written to them or after
+    # max_seconds. Everything buffered is written on close(), which also runs at
+    # interpreter exit.
+    #
+    # When the buffer is full, record() waits for the writer (block=True, nothing
+    # is lost) or drops the event and counts it in `dropped`.
+    def __init__(self, directory: str, name: str = "audit", max_bytes: int = 64 << 20, max_seconds: float = 3600,
+                 capacity: int = 1 << 16, batch_size: int = 4096, flush_interval: float = 1.0, block: bool = True):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # seconds between writes of a partial batch
+        self.block = block
+        self.paths: list[str] = []  # files written so far
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flush_target = 0
+        self._file = None
+        self._file_bytes = 0
+        self._file_opened = None
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, kind: str, data):
+        # data must not be mutated afterwards (it is serialized later, on the writer thread)
+        with self._condition:
+            if self._closed:
+                raise ValueError("AuditWriter is closed")
+            if len(self._buffer) >= self.capacity:
+                if not self.block:
+                    self.dropped += 1
+                    return
+                while len(self._buffer) >= self.capacity and not self._closed and self._thread.is_alive():
+                    self._condition.wait()
+            self._buffer.append((time.time_ns(), kind, data))
+            self.recorded += 1
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self):
+        # blocks until everything recorded so far is written and flushed to disk
+        with self._condition:
+            self._flush_target = self.recorded  # dropped events are not counted in recorded
+            self._condition.notify_all()
+            while self.written < self._flush_target and self._thread.is_alive():
+                self._condition.wait()
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # let a partial batch fill up for flush_interval, unless closing or flushing
+                flushing = self.written < self._flush_target
+                if not self._closed and (not self._buffer or (len(self._buffer) < self.batch_size and not flushing)):
+                    self._condition.wait(self.flush_interval)
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.batch_size))]
+                closed = self._closed and not self._buffer
+                self._condition.notify_all()  # room for blocked record() calls
+            if batch:
+                self._write(batch)
+            if closed:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                with self._condition:
+                    self._condition.notify_all()
+                return
+
+    def _write(self, batch: list):
+        lines = "".join(json.dumps(event, separators=(",", ":"), default=str) + "\n" for event in batch)
+        now = time.time()
+        if self._file is not None and (self._file_bytes >= self.max_bytes or now - self._file_opened >= self.max_seconds):
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(now))
+            path = os.path.join(self.directory, f"{self.name}-{stamp}-{len(self.paths)}.jsonl.gz")
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            self._file_bytes = 0
+            self._file_opened = now
+            self.paths.append(path)
+        self._file.write(lines)
+        self._file.flush()
+        self._file_bytes += len(lines)
+        with self._condition:
+            self.written += len(batch)
+            self._condition.notify_all()
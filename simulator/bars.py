@@ -0,0 +1,103 @@
+# Bars built locally from trades, so strategies don't depend on exchange kline
+# streams (and can be backtested on trade data only). Closed bars have the same
+# shape as exchange candles:
+# (start_ts, end_ts, interval, open, high, low, close, volume, turnover)
+# with interval "<type>:<size>", e.g. "time:60" or "volume:50".
+
+TIME = "time"  # size in seconds, aligned to multiples of size
+TICK = "tick"  # size in trades
+VOLUME = "volume"  # size in base currency
+DOLLAR = "dollar"  # size in quote currency (price * size)
+BAR_TYPES = (TIME, TICK, VOLUME, DOLLAR)
+
+
+class BarBuilder:
+    # Builds one bar type for one symbol. Tick, volume and dollar bars close on
+    # the trade that reaches the threshold (that trade is not split across bars);
+    # time bars close on the first event at or after their end. Intervals without
+    # trades produce no bar.
+    __slots__ = ("kind", "size", "interval", "start", "end", "open", "high", "low", "close",
+                 "volume", "turnover", "count")
+
+    def __init__(self, kind: str, size: float):
+        if kind not in BAR_TYPES:
+            raise ValueError(f"Unknown bar type {kind!r}, expected one of {BAR_TYPES}")
+        if size <= 0:
+            raise ValueError(f"Bar size must be positive, got {size}")
+        self.kind = kind
+        self.size = size
+        self.interval = f"{kind}:{size}"
+        self.start = None
+        self.end = None
+        self.count = 0
+
+    def _close(self) -> tuple:
+        self.count = 0
+        return (self.start, self.end, self.interval, self.open, self.high, self.low, self.close,
+                self.volume, self.turnover)
+
+    def advance(self, timestamp: float) -> tuple:  # closed time bar, or None
+        if self.kind == TIME and self.count and timestamp >= self.end:
+            return self._close()
+        return None
+
+    def on_trade(self, price: float, size: float, timestamp: float) -> tuple:  # closed bar, or None
+        closed = self.advance(timestamp)
+        if self.count == 0:
+            self.open = self.high = self.low = price
+            self.volume = 0
+            self.turnover = 0
+            if self.kind == TIME:
+                self.start = timestamp - timestamp % self.size
+                self.end = self.start + self.size
+            else:
+                self.start = timestamp
+        elif price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += size
+        self.turnover += price * size
+        self.count += 1
+        if self.kind == TIME:
+            return closed
+        self.end = timestamp
+        if self.kind == TICK:
+            done = self.count >= self.size
+        elif self.kind == VOLUME:
+            done = self.volume >= self.size
+        else:
+            done = self.turnover >= self.size
+        return self._close() if done else None
+
+
+class BarAggregator:
+    # All bar builders of one symbol, O(1) per trade and builder. advance() is a
+    # single comparison unless a time bar is due.
+    def __init__(self, specs: list[tuple[str, float]]):
+        self.builders = [BarBuilder(kind, size) for kind, size in specs]
+        self._time_builders = [builder for builder in self.builders if builder.kind == TIME]
+        self.next_close = None  # end of the earliest open time bar
+
+    def on_trade(self, price: float, size: float, timestamp: float) -> list[tuple]:
+        closed = []
+        for builder in self.builders:
+            bar = builder.on_trade(price, size, timestamp)
+            if bar is not None:
+                closed.append(bar)
+        if self._time_builders:
+            self.next_close = min(builder.end for builder in self._time_builders)
+        return closed
+
+    def advance(self, timestamp: float) -> list[tuple]:
+        if self.next_close is None or timestamp < self.next_close:
+            return []
+        closed = []
+        for builder in self._time_builders:
+            bar = builder.advance(timestamp)
+            if bar is not None:
+                closed.append(bar)
+        ends = [builder.end for builder in self._time_builders if builder.count]
+        self.next_close = min(ends) if ends else None
+        return closed
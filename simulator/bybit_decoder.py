@@ -0,0 +1,41 @@
+from array import array
+from itertools import chain
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # pragma: no cover
+    import json
+    loads = json.loads
+
+# Decoding helpers for Bybit v5 public messages. Price levels are converted in
+# one pass into a flat array of doubles ([price0, size0, price1, size1, ...])
+# instead of a (price, size) tuple per level.
+
+_CHANNELS = {
+    "orderbook": "orderbook",
+    "publicTrade": "trade",
+    "kline": "candle",
+    "liquidation": "liquidation",
+}
+
+
+def message_channel(data: dict) -> str:
+    # handler channel of a decoded message ("orderbook", "trade", ...), None for non-data messages
+    topic = data.get("topic")
+    if topic is None:
+        return None
+    return _CHANNELS.get(topic[:topic.find(".")])
+
+
+def topic_symbol(topic: str) -> str:
+    return topic[topic.rfind(".") + 1:]
+
+
+def decode_levels(levels: list) -> array:
+    return array("d", map(float, chain.from_iterable(levels)))
+
+
+def level_pairs(flat: array):
+    # iterates (price, size) over a flat level array; zip reuses its result tuple
+    return zip(flat[0::2], flat[1::2])
@@ -1,80 +1,133 @@
+from time import perf_counter_ns, time_ns
+
 from pybit.unified_trading import WebSocket
 from .abstract_strategy import AbstractStrategy
+from .audit import AuditWriter
 
+from .bybit_decoder import decode_levels, level_pairs, loads, message_channel, topic_symbol
 from .exchange_handler import ExchangeHandler
+from .latency import BOOK_APPLY, EXCHANGE_TO_RECEIVE, PARSE
+from .recorder import Recorder
 
 
 class BybitHandler(ExchangeHandler):
-    def __init__(self, api_key, api_secret, symbols: set[str], orderbook_depth: int = 50, kline_intervals: dict[str, str] = {"BTCUSDT": "1"}):
+    def __init__(self, api_key, api_secret, symbols: set[str], orderbook_depth: int = 50, kline_intervals: dict[str, str] = {"BTCUSDT": "1"}, recorder: Recorder = None, transport=None, audit: AuditWriter = None):
         super().__init__(name="Bybit", symbols=symbols)
         self.api_key = api_key
         self.api_secret = api_secret
-        self.websocket = WebSocket(testnet=False, channel_type="linear")
+        self.websocket = None
         self.orderbook_depth = orderbook_depth
         self.kline_intervals = kline_intervals
+        self.recorder = recorder
+        # anything with pybit WebSocket's *_stream methods, e.g. transport.LocalTransport (pybit's WebSocket if None)
+        self.transport = transport
+        self.audit = audit  # liquidations are logged to it (off if None)
+        self._callbacks = {
+            "orderbook": self.update_orderbook,
+            "trade": self.update_trade,
+            "candle": self.update_candle,
+            "liquidation": self.update_liquidation,
+        }
 
     def start(self, strategy: AbstractStrategy):
         super().start(strategy)
+        if self.transport is not None:
+            self.websocket = self.transport
+        else:
+            self.websocket = WebSocket(testnet=False, channel_type="linear")
         for symbol in self.symbols:
             self.websocket.orderbook_stream(depth=self.orderbook_depth,
                                             symbol=symbol,
                                             callback=self.update_orderbook)
             self.websocket.trade_stream(symbol, self.update_trade)
             self.websocket.liquidation_stream(symbol, self.update_liquidation)
-            for symbol in self.kline_intervals:
-                for interval in self.kline_intervals[symbol]:
-                    self.websocket.kline_stream(interval=interval,
-                                                symbol=symbol,
-                                                callback=self.update_candle)
+        for symbol, intervals in self.kline_intervals.items():
+            # one interval ("1") or several (["1", "5"]) per symbol
+            for interval in ([intervals] if isinstance(intervals, str) else intervals):
+                self.websocket.kline_stream(interval=interval,
+                                            symbol=symbol,
+                                            callback=self.update_candle)
+
+    def on_message(self, frame):
+        # entry point for raw websocket frames (bytes or str)
+        data = loads(frame)
+        channel = message_channel(data)
+        if channel is not None:
+            self._callbacks[channel](data)
 
     def update_orderbook(self, data):
-        bids = map(lambda x: (float(x[0]), float(x[1])), data["data"]["b"])
-        asks = map(lambda x: (float(x[0]), float(x[1])), data["data"]["a"])
-        symbol = data["data"]["s"]
-        ts = data["data"]["u"]/1000
-        if data["type"] == "snapshot":
-            self.orderbook(symbol=symbol).update(
-                bids=bids, asks=asks, timestamp=ts)
-        elif data["type"] == "delta":
-            self.orderbook(symbol=symbol).delta_update(
-                bids=bids, asks=asks, timestamp=ts)
+        latency = self.latency
+        if latency is not None:
+            received = time_ns()
+        if self.recorder is not None:
+            self.recorder.record("orderbook", data)
+        if latency is not None:
+            started = perf_counter_ns()  # after recording, so PARSE only measures decoding
+        book = data["data"]
+        bids = level_pairs(decode_levels(book["b"]))
+        asks = level_pairs(decode_levels(book["a"]))
+        symbol = book["s"]
+        ts = data["ts"]/1000
+        if latency is not None:
+            parsed = perf_counter_ns()
+            latency.record(EXCHANGE_TO_RECEIVE, symbol, received - data["ts"] * 1_000_000)
+            latency.record(PARSE, symbol, parsed - started)
+        orderbook = self.orderbook(symbol)
+        with orderbook.lock:
+            if data["type"] == "snapshot":
+                orderbook.update(bids=bids, asks=asks, timestamp=ts)
+            elif data["type"] == "delta":
+                orderbook.delta_update(bids=bids, asks=asks, timestamp=ts)
+        if latency is not None:
+            latency.record(BOOK_APPLY, symbol, perf_counter_ns() - parsed)
 
-        self.strategy.on_orderbook_update(
-            symbol=symbol, exchange=self, orderbook=self.orderbook(symbol), timestamp=ts)
+        self.strategy._on_orderbook_update(
+            symbol=symbol, exchange=self, orderbook=orderbook, timestamp=ts)
 
     def update_trade(self, data):
+        if self.recorder is not None:
+            self.recorder.record("trade", data)
+        latency = self.latency
+        if latency is not None:
+            received = time_ns()
         for trade in data["data"]:
             symbol = trade["s"]
             ts = trade["T"]/1000
             price = float(trade["p"])
             size = float(trade["v"])
             side = trade["S"]
-            self.strategy.on_trade(
+            if latency is not None:
+                latency.record(EXCHANGE_TO_RECEIVE, symbol, received - trade["T"] * 1_000_000)
+            self.strategy._on_trade(
                 symbol=symbol, exchange=self, side=side, price=price, size=size, timestamp=ts)
 
     def update_candle(self, data):
-        symbol = data["topic"].split(".")[2]
+        if self.recorder is not None:
+            self.recorder.record("candle", data)
+        symbol = topic_symbol(data["topic"])
         for candle_data in data["data"]:
             start = candle_data["start"]/1000
             end = candle_data["end"]/1000
             interval = candle_data["interval"]
             open = float(candle_data["open"])
-            close = float(candle_data["close"])
             high = float(candle_data["high"])
             low = float(candle_data["low"])
+            close = float(candle_data["close"])
             volume = float(candle_data["volume"])
             turnover = float(candle_data["turnover"])
             ts = candle_data["timestamp"]/1000
             confirmed = candle_data["confirm"]
 
-            candle = (start, end, interval, open, close,
-                      high, low, volume, turnover)
-            self.strategy.on_candle_update(
+            candle = (start, end, interval, open, high,
+                      low, close, volume, turnover)
+            self.strategy._on_candle_update(
                 symbol=symbol, exchange=self, candle=candle, timestamp=ts, confirmed=confirmed)
 
     def update_liquidation(self, data):
-        with open("liquidation.txt", "a") as f:
-            f.write(str(data) + "\n")
+        if self.recorder is not None:
+            self.recorder.record("liquidation", data)
+        if self.audit is not None:
+            self.audit.record("liquidation", data)
         for liquidation in data["data"]:
             symbol = liquidation["symbol"]
             ts = liquidation["updatedTime"]/1000
@@ -82,5 +135,5 @@ class BybitHandler(ExchangeHandler):
             size = float(liquidation["size"])
             side = liquidation["side"]
 
-            self.strategy.on_liquidation(
+            self.strategy._on_liquidation(
                 symbol=symbol, exchange=self, side=side, price=price, size=size, timestamp=ts)
@@ -0,0 +1,31 @@
+from .orderbook import Orderbook
+
+
+class BookConflation:
+    # Decides which orderbook updates of one symbol reach on_orderbook_update.
+    # With interval_ms, at most one update is delivered per interval (of exchange
+    # time, so live and replay behave the same); with top_of_book, an update is only
+    # delivered if the best bid/ask price or size changed since the last delivered
+    # one. Suppressed updates are not lost: the book is always fully up to date, and
+    # the next delivered update reflects everything that happened in between.
+    __slots__ = ("interval", "top_of_book", "last_time", "last_top")
+
+    def __init__(self, interval_ms: float = None, top_of_book: bool = False):
+        self.interval = interval_ms / 1000 if interval_ms is not None else None
+        self.top_of_book = top_of_book
+        self.last_time = None
+        self.last_top = None
+
+    def should_notify(self, orderbook: Orderbook, timestamp: float) -> bool:
+        if self.top_of_book:
+            best_bid, best_ask = orderbook.best_bid, orderbook.best_ask
+            top = (best_bid, best_ask, orderbook.bids.get(best_bid), orderbook.asks.get(best_ask))
+            if top == self.last_top:
+                return False
+        else:
+            top = None
+        if self.interval is not None and self.last_time is not None and timestamp - self.last_time < self.interval:
+            return False
+        self.last_time = timestamp
+        self.last_top = top
+        return True
@@ -0,0 +1,61 @@
+import heapq
+from itertools import count
+
+SCHEDULED = -1  # kind of scheduled callbacks: before market data with the same timestamp
+
+
+class EventClock:
+    # Global simulation clock over the event streams of several handlers. Each
+    # source yields (timestamp_ms, kind, callback, args) in timestamp order (see
+    # ExchangeHandler.events); the clock keeps one pending event per source in a
+    # heap and dispatches them in (timestamp, kind, arrival) order, so a run is
+    # deterministic and memory stays at one event per source plus whatever is
+    # scheduled, however long the run.
+    #
+    # feed_latency shifts an exchange's market data (in ms) relative to the other
+    # exchanges; order_latency is the delay (in ms) between a strategy sending an
+    # order or cancel to an exchange and the exchange acting on it.
+    def __init__(self, feed_latency: dict[str, float] = None, order_latency: dict[str, float] = None):
+        self.feed_latency = dict(feed_latency or {})
+        self.order_latency = dict(order_latency or {})
+        self.now = None  # ms, time of the event being dispatched (None outside run())
+        self._heap = []
+        self._sequence = count()
+
+    def add_source(self, exchange: str, events):
+        entry = self._next_entry(iter(events), self.feed_latency.get(exchange, 0))
+        if entry is not None:
+            heapq.heappush(self._heap, entry)
+
+    def _next_entry(self, events, offset: float):
+        for timestamp, kind, callback, args in events:
+            return (timestamp + offset, kind, next(self._sequence), callback, args, events, offset)
+        return None
+
+    def schedule(self, timestamp: float, callback, *args):
+        # calls callback(*args) once the clock reaches timestamp (ms)
+        heapq.heappush(self._heap, (timestamp, SCHEDULED, next(self._sequence), callback, args, None, 0))
+
+    def run(self, until: float = None):
+        # dispatches events until every source is exhausted, or until the next one is after `until`
+        heap = self._heap
+        heappop, heappushpop = heapq.heappop, heapq.heappushpop
+        entry = heappop(heap) if heap else None
+        while entry is not None:
+            if until is not None and entry[0] > until:
+                heapq.heappush(heap, entry)
+                return
+            timestamp, _, _, callback, args, events, offset = entry
+            self.now = timestamp
+            following = self._next_entry(events, offset) if events is not None else None
+            callback(*args)
+            # the source's next event usually stays the earliest one, and then
+            # heappushpop hands it straight back without touching the heap
+            if following is not None:
+                entry = heappushpop(heap, following)
+            else:
+                entry = heappop(heap) if heap else None
+        self.now = None
+
+    def pending(self) -> int:
+        return len(self._heap)
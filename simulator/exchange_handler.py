@@ -6,10 +6,20 @@ class ExchangeHandler:
         self.symbols: set[str] = symbols.copy()
         self.orderbooks: dict[str, Orderbook] = dict()
         self.strategy = None
+        self.latency = None  # LatencyMonitor, set by the strategy when instrumentation is on
 
     def start(self, strategy):
         self.strategy = strategy
 
+    def run(self):  # blocks until the handler's data is exhausted (replay only)
+        pass
+
+    def events(self):
+        # Replay handlers return an iterator of (timestamp_ms, kind, callback, args)
+        # in timestamp order, which AbstractStrategy.start merges across handlers
+        # with an EventClock; live handlers return None and push events themselves.
+        return None
+
     def orderbook(self, symbol: str):
         if symbol not in self.orderbooks:
             self.orderbooks[symbol] = Orderbook(symbol)
@@ -0,0 +1,76 @@
+from .orderbook import Orderbook
+from .records import Order, Side
+from .resting_orders import RestingOrders
+
+
+class CrossFillModel:
+    # Fills a resting limit order as soon as the opposite best price reaches it.
+    # Optimistic: assumes the order is always at the front of its queue.
+    def on_order_added(self, resting_orders: RestingOrders, order: Order, orderbook: Orderbook):
+        pass
+
+    def on_orderbook_update(self, resting_orders: RestingOrders, orderbook: Orderbook) -> list[Order]:
+        return resting_orders.crossed(orderbook.best_bid, orderbook.best_ask)
+
+    def on_trade(self, resting_orders: RestingOrders, side: str, price: float, size: float) -> list[Order]:
+        return []
+
+
+class QueueFillModel(CrossFillModel):
+    # Tracks the size queued ahead of each resting order at its price level.
+    # The queue starts at the level's size when the order is placed and shrinks
+    # with the volume of trades printed at that price. Cancels are attributed to
+    # orders behind ours: the estimate only drops when the level itself becomes
+    # smaller than it, which fills later than a real queue where some cancels come
+    # from ahead. The order fills once a trade at its price is larger than what
+    # remains ahead of it, or when the market trades/crosses through it.
+    #
+    # Book updates only look at the resting levels whose book size changed (the
+    # orderbook tracks changed prices once an order has been added).
+    def on_order_added(self, resting_orders: RestingOrders, order: Order, orderbook: Orderbook):
+        orderbook.track_changes = True
+        levels = orderbook.bids if order.side == Side.BUY else orderbook.asks
+        resting_orders.queue_ahead[order.order_id] = levels.get(order.price, 0.0)
+
+    def on_orderbook_update(self, resting_orders: RestingOrders, orderbook: Orderbook) -> list[Order]:
+        filled = resting_orders.crossed(orderbook.best_bid, orderbook.best_ask)
+        changes = orderbook.take_changes()
+        for side, book_levels, changed in ((Side.BUY, orderbook.bids, changes and changes[0]),
+                                           (Side.SELL, orderbook.asks, changes and changes[1])):
+            levels = resting_orders.levels(side)
+            if not levels:
+                continue
+            if changes is None:  # snapshot: every level may have changed
+                changed = list(levels)
+            for price in changed:
+                level = levels.get(price)
+                if level:
+                    self._cap_queue(resting_orders.queue_ahead, level, book_levels.get(price, 0.0))
+        return filled
+
+    @staticmethod
+    def _cap_queue(queue_ahead: dict, level: dict, size: float):
+        for order_id in level:
+            if queue_ahead[order_id] > size:
+                queue_ahead[order_id] = size
+
+    def on_trade(self, resting_orders: RestingOrders, side: str, price: float, size: float) -> list[Order]:
+        # side is the taker's side: sells trade against resting buys and vice versa
+        if side == "Sell":
+            filled = resting_orders.crossed(None, price, inclusive=False)
+            level = resting_orders.level(Side.BUY, price)
+        else:
+            filled = resting_orders.crossed(price, None, inclusive=False)
+            level = resting_orders.level(Side.SELL, price)
+        if level:
+            queue_ahead = resting_orders.queue_ahead
+            reached = []
+            for order_id in level:
+                remaining = queue_ahead[order_id] - size
+                if remaining < 0:
+                    reached.append(order_id)
+                else:
+                    queue_ahead[order_id] = remaining
+            for order_id in reached:
+                filled.append(resting_orders.remove(order_id))
+        return filled
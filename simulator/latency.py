@@ -0,0 +1,132 @@
+import os
+import threading
+
+# Stages of the hot path, from an exchange message to the strategy's reaction
+EXCHANGE_TO_RECEIVE = "exchange_to_receive"  # exchange timestamp -> handler callback (wall clock)
+PARSE = "parse"                              # decoding the message
+BOOK_APPLY = "book_apply"                    # Orderbook.update/delta_update
+MATCHING = "matching"                        # simulated limit order matching
+CALLBACK = "callback"                        # user-defined strategy callback
+
+_SUB_BUCKET_BITS = 6  # 2^5 buckets per power of two, i.e. ~3% relative precision
+_HALF = 1 << (_SUB_BUCKET_BITS - 1)
+_MAX_BITS = 42  # values are clamped at ~73 minutes (in ns)
+_BUCKETS = (_MAX_BITS - _SUB_BUCKET_BITS + 2) * _HALF
+
+
+def _bucket(value: int) -> int:
+    if value < (1 << _SUB_BUCKET_BITS):
+        return value if value > 0 else 0
+    shift = value.bit_length() - _SUB_BUCKET_BITS
+    index = shift * _HALF + (value >> shift)
+    return index if index < _BUCKETS else _BUCKETS - 1
+
+
+def _bucket_value(index: int) -> int:
+    # upper bound of the values counted in a bucket
+    if index < (1 << _SUB_BUCKET_BITS):
+        return index
+    shift = index // _HALF - 1
+    return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    # HDR-style histogram of nanosecond values with log-linear buckets: recording
+    # is a bucket computation and a list increment, without locks. Each histogram
+    # is meant to be written by a single thread (one per stage and symbol);
+    # snapshots taken from other threads may be off by the values being recorded.
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        self.counts[_bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percentile: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = percentile / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(_bucket_value(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {"count": self.count, "mean": self.total / self.count if self.count else 0,
+                "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+                "p99.9": self.percentile(99.9), "max": self.max}
+
+
+class LatencyMonitor:
+    # Per-stage, per-symbol latency histograms (values in ns). Handlers and
+    # strategies only record when they have a monitor, so leaving it unset costs
+    # a single attribute check per message.
+    _QUANTILES = ((0.5, 50), (0.9, 90), (0.99, 99), (0.999, 99.9))
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, str], LatencyHistogram] = dict()
+        self._exporter = None
+        self._stop_exporter = threading.Event()
+
+    def histogram(self, stage: str, symbol: str) -> LatencyHistogram:
+        histogram = self.histograms.get((stage, symbol))
+        if histogram is None:
+            histogram = self.histograms[(stage, symbol)] = LatencyHistogram()
+        return histogram
+
+    def record(self, stage: str, symbol: str, value: int):
+        histogram = self.histograms.get((stage, symbol))
+        if histogram is None:
+            histogram = self.histogram(stage, symbol)
+        histogram.record(value if value > 0 else 0)
+
+    def snapshot(self) -> dict[str, dict[str, dict]]:
+        # stage -> symbol -> {"count", "mean", "p50", "p90", "p99", "p99.9", "max"}
+        snapshot = dict()
+        for (stage, symbol), histogram in list(self.histograms.items()):
+            snapshot.setdefault(stage, dict())[symbol] = histogram.summary()
+        return snapshot
+
+    def prometheus(self, metric: str = "hft_latency_seconds") -> str:
+        lines = [f"# HELP {metric} Hot path latency per stage and symbol.", f"# TYPE {metric} summary"]
+        for (stage, symbol), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{stage}",symbol="{symbol}"'
+            for quantile, percentile in self._QUANTILES:
+                lines.append(f'{metric}{{{labels},quantile="{quantile}"}} {histogram.percentile(percentile) / 1e9:.9f}')
+            lines.append(f"{metric}_sum{{{labels}}} {histogram.total / 1e9:.9f}")
+            lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # atomically replaces `path`, e.g. for node_exporter's textfile collector
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def start_exporter(self, path: str, interval: float = 10.0):
+        # writes the Prometheus text file every `interval` seconds from a background thread
+        def export():
+            while not self._stop_exporter.wait(interval):
+                self.write_prometheus(path)
+            self.write_prometheus(path)
+
+        self._stop_exporter.clear()
+        self._exporter = threading.Thread(target=export, daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self):
+        if self._exporter is not None:
+            self._stop_exporter.set()
+            self._exporter.join()
+            self._exporter = None
@@ -0,0 +1,350 @@
+import argparse
+import random
+import socket
+import sys
+import threading
+import time
+from itertools import cycle, islice
+
+from .bybit_decoder import topic_symbol
+from .recorder import read_recording
+from .transport import OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, encode_frame, read_frame
+
+try:
+    import orjson
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:  # pragma: no cover
+    import json
+    loads = json.loads
+
+    def dumps(data) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+# Local stand-in for Bybit's v5 public linear websocket, for load and soak
+# testing without network access. Clients subscribe to topics as on Bybit
+# ({"op": "subscribe", "args": [...]}) and receive orderbook, trade, kline and
+# liquidation frames for them from a feed, at a fixed rate per connection.
+# Orderbook topics match whatever their depth, so a capture taken at depth 200
+# serves orderbook.50 subscribers (frames carry the subscribed topic).
+# Message timestamps are set when a frame is sent, so the latency a client
+# measures from them is the end-to-end latency through the local socket.
+#
+# Frames are encoded once into a pool of pool_size frames per connection, which
+# is then sent in a loop with only the timestamps patched in, so the rate is not
+# bounded by building messages in Python. With --stats-interval, the server
+# prints "stats {...}" lines with the frames it actually sent and the time it
+# spent blocked on the socket (a client that does not keep up).
+#
+#   python -m simulator.local_bybit --rate 50000
+#   python -m simulator.local_bybit --capture btcusdt.jsonl.gz --rate 20000
+
+
+def topic_key(topic: str) -> str:
+    # the key subscriptions are matched on: the topic, without the orderbook depth
+    if topic.startswith("orderbook."):
+        return "orderbook." + topic_symbol(topic)
+    return topic
+
+
+class SyntheticFeed:
+    # Endless Bybit-shaped messages for every subscribed symbol, with a random
+    # walk mid price: mostly orderbook deltas, then trades, klines and liquidations.
+    def __init__(self, depth: int = 50, tick: float = 0.1, seed: int = 0):
+        self.depth = depth
+        self.tick = tick
+        self.random = random.Random(seed)
+
+    def _snapshot(self, symbol: str, mid: float, ts: int, seq: int) -> dict:
+        tick = self.tick
+        return {"topic": f"orderbook.{self.depth}.{symbol}", "type": "snapshot", "ts": ts,
+                "data": {"s": symbol, "b": [[f"{mid - tick * (i + 1):.1f}", "1.000"] for i in range(self.depth)],
+                         "a": [[f"{mid + tick * (i + 1):.1f}", "1.000"] for i in range(self.depth)], "u": seq, "seq": seq}}
+
+    def messages(self, topics: dict):
+        # yields (topic, message) for the topics currently subscribed (topic_key -> topic)
+        rnd, tick, depth = self.random, self.tick, self.depth
+        mids = dict()
+        snapshots_sent = set()
+        seq = 0
+        symbols = []
+        topic_count = -1
+        while True:
+            if len(topics) != topic_count:
+                topic_count = len(topics)
+                symbols = sorted({topic_symbol(topic) for topic in list(topics.values())})
+                if not symbols:
+                    yield None, None
+                    continue
+            for symbol in symbols:
+                seq += 1
+                mid = mids.get(symbol, 30000.0)
+                r = rnd.random()
+                if r < 0.8:
+                    topic = topics.get("orderbook." + symbol)
+                    if topic is None:
+                        continue
+                    if topic not in snapshots_sent:
+                        snapshots_sent.add(topic)
+                        snapshot = self._snapshot(symbol, mid, 0, seq)
+                        snapshot["topic"] = topic
+                        yield topic, snapshot
+                        continue
+                    bids = [[f"{mid - tick * rnd.randint(1, depth):.1f}", f"{rnd.choice((0, rnd.random())):.3f}"]
+                            for _ in range(rnd.randint(1, 5))]
+                    asks = [[f"{mid + tick * rnd.randint(1, depth):.1f}", f"{rnd.choice((0, rnd.random())):.3f}"]
+                            for _ in range(rnd.randint(1, 5))]
+                    yield topic, {"topic": topic, "type": "delta", "ts": 0,
+                                  "data": {"s": symbol, "b": bids, "a": asks, "u": seq, "seq": seq}}
+                elif r < 0.98:
+                    mids[symbol] = mid = mid + tick * rnd.choice((-1, 0, 1))
+                    topic = f"publicTrade.{symbol}"
+                    if topic not in topics:
+                        continue
+                    yield topic, {"topic": topic, "type": "snapshot", "ts": 0,
+                                  "data": [{"T": 0, "s": symbol, "S": rnd.choice(("Buy", "Sell")),
+                                            "v": f"{rnd.random():.3f}", "p": f"{mid:.1f}", "i": str(seq)}]}
+                elif r < 0.99:
+                    topic = f"kline.1.{symbol}"
+                    if topic not in topics:
+                        continue
+                    yield topic, {"topic": topic, "type": "snapshot", "ts": 0,
+                                  "data": [{"start": 0, "end": 0, "interval": "1", "open": f"{mid:.1f}",
+                                            "close": f"{mid:.1f}", "high": f"{mid + tick:.1f}", "low": f"{mid - tick:.1f}",
+                                            "volume": "1.000", "turnover": f"{mid:.1f}", "confirm": False, "timestamp": 0}]}
+                else:
+                    topic = f"liquidation.{symbol}"
+                    if topic not in topics:
+                        continue
+                    yield topic, {"topic": topic, "type": "snapshot", "ts": 0,
+                                  "data": [{"symbol": symbol, "updatedTime": 0, "price": f"{mid:.1f}",
+                                            "size": f"{rnd.random():.3f}", "side": rnd.choice(("Buy", "Sell"))}]}
+
+
+class CaptureFeed:
+    # Messages of a Recorder capture, looped, for the subscribed topics.
+    def __init__(self, paths: list[str], loop: bool = True):
+        self.paths = list(paths)
+        self.loop = loop
+
+    def topics(self) -> set[str]:
+        # every topic in the capture
+        return {data["topic"] for path in self.paths for _, _, data in read_recording(path)}
+
+    def messages(self, topics: dict):
+        while True:
+            found = False
+            for path in self.paths:
+                for _, _, data in read_recording(path):
+                    topic = topics.get(topic_key(data["topic"]))
+                    if topic is not None:
+                        found = True
+                        data["topic"] = topic
+                        yield topic, data
+            if not self.loop:
+                return
+            if not found:
+                yield None, None
+
+
+def _stamp(data: dict, now: int) -> int:
+    # sets the message's exchange timestamps to the send time (ms), returns how many were set
+    data["ts"] = now
+    stamped = 1
+    payload = data["data"]
+    if isinstance(payload, list):
+        for item in payload:
+            if "T" in item:
+                item["T"] = now
+            elif "updatedTime" in item:
+                item["updatedTime"] = now
+            elif "timestamp" in item:
+                item["timestamp"] = now
+            else:
+                continue
+            stamped += 1
+    return stamped
+
+
+# Placeholder timestamp of pooled frames: as many digits as a ms timestamp until
+# the year 2286, so patching the send time in keeps the frame length.
+_PLACEHOLDER = 9_999_999_999_999
+_PLACEHOLDER_BYTES = b"%d" % _PLACEHOLDER
+
+
+def _pooled_frame(data: dict, now: int) -> tuple[bytes, ...]:
+    # the frame split around its timestamps, to be sent as send_time.join(parts)
+    stamped = _stamp(data, _PLACEHOLDER)
+    frame = encode_frame(dumps(data), OP_TEXT)
+    parts = tuple(frame.split(_PLACEHOLDER_BYTES))
+    if len(parts) != stamped + 1:
+        # the placeholder also occurs in the message: send it with this timestamp every time
+        _stamp(data, now)
+        return (encode_frame(dumps(data), OP_TEXT),)
+    return parts
+
+
+class LocalBybitServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, rate: float = 1000, feed=None, batch_size: int = 500,
+                 pool_size: int = 50_000):
+        self.host = host
+        self.port = port
+        self.rate = rate  # messages per second per connection
+        self.feed = feed if feed is not None else SyntheticFeed()
+        self.batch_size = batch_size  # most frames written in one send
+        self.pool_size = pool_size  # frames encoded per connection before looping over them (0: encode every frame)
+        self.sent = 0
+        self.send_wait = 0.0  # seconds spent blocked sending frames
+        self._socket = None
+        self._running = False
+
+    def serve_forever(self):
+        self._socket = socket.create_server((self.host, self.port), reuse_port=False)
+        self._running = True
+        while self._running:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def report_stats(self, interval: float, file=sys.stdout):
+        # prints 'stats {"time": ..., "sent": ..., "send_wait": ...}' every interval seconds, run on a daemon thread
+        while True:
+            print(f'stats {{"time": {time.time()}, "sent": {self.sent}, "send_wait": {self.send_wait}}}', file=file, flush=True)
+            time.sleep(interval)
+
+    def stop(self):
+        self._running = False
+        if self._socket is not None:
+            self._socket.close()
+
+    def _handshake(self, connection: socket.socket, stream) -> bool:
+        key = None
+        while True:
+            line = stream.readline()
+            if not line:
+                return False
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            return False
+        connection.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           b"Sec-WebSocket-Accept: %s\r\n\r\n" % accept_key(key))
+        return True
+
+    def _read_requests(self, connection: socket.socket, stream, topics: dict, send_lock: threading.Lock, closed: threading.Event):
+        while True:
+            try:
+                opcode, payload = read_frame(stream)
+            except OSError:
+                break
+            if opcode is None or opcode == OP_CLOSE:
+                break
+            if opcode == OP_PING:
+                with send_lock:
+                    connection.sendall(encode_frame(payload, OP_PONG))
+                continue
+            request = loads(payload)
+            if request.get("op") == "subscribe":
+                topics.update((topic_key(topic), topic) for topic in request.get("args", []))
+                reply = {"success": True, "ret_msg": "", "conn_id": "local", "op": "subscribe"}
+            else:
+                reply = {"success": True, "ret_msg": "pong", "conn_id": "local", "op": request.get("op")}
+            with send_lock:
+                connection.sendall(encode_frame(dumps(reply)))
+        closed.set()
+
+    def _serve(self, connection: socket.socket):
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = connection.makefile("rb")
+        if not self._handshake(connection, stream):
+            connection.close()
+            return
+        topics = dict()  # topic_key -> subscribed topic
+        send_lock = threading.Lock()
+        closed = threading.Event()
+        threading.Thread(target=self._read_requests, args=(connection, stream, topics, send_lock, closed), daemon=True).start()
+
+        messages = self.feed.messages(topics)
+        pool = []
+        pooled = None  # cycles over pool once it holds pool_size frames
+        topic_count = 0
+        started = time.perf_counter()
+        sent = 0
+        try:
+            while self._running and not closed.is_set():
+                due = int((time.perf_counter() - started) * self.rate) - sent
+                if due <= 0:
+                    time.sleep(0.0005)
+                    continue
+                if len(topics) != topic_count:
+                    # new subscriptions: the pool must include their messages
+                    topic_count = len(topics)
+                    pool = []
+                    pooled = None
+                now = time.time_ns() // 1_000_000
+                count = min(due, self.batch_size)
+                if pooled is not None:
+                    frames = list(islice(pooled, count))
+                else:
+                    frames = []
+                    for _ in range(count):
+                        topic, data = next(messages, (None, None))
+                        if topic is None:
+                            break
+                        frames.append(_pooled_frame(data, now))
+                    if self.pool_size > 0:
+                        pool.extend(frames)
+                        if len(pool) >= self.pool_size:
+                            pooled = cycle(pool)
+                if not frames:
+                    # nothing subscribed (yet) or the capture is exhausted
+                    time.sleep(0.01)
+                    started = time.perf_counter()
+                    sent = 0
+                    continue
+                stamp = b"%d" % now
+                payload = b"".join([stamp.join(parts) for parts in frames])
+                waited = time.perf_counter()
+                with send_lock:
+                    connection.sendall(payload)
+                self.send_wait += time.perf_counter() - waited
+                sent += len(frames)
+                self.sent += len(frames)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Bybit v5 public websocket stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1000, help="messages per second per connection")
+    parser.add_argument("--capture", nargs="*", help="Recorder captures to replay (synthetic messages if omitted)")
+    parser.add_argument("--depth", type=int, default=50, help="orderbook depth of synthetic messages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pool", type=int, default=50_000, help="frames encoded per connection before looping over them (0: encode every frame)")
+    parser.add_argument("--stats-interval", type=float, default=0, help="print the frames sent every this many seconds")
+    args = parser.parse_args()
+
+    feed = CaptureFeed(args.capture) if args.capture else SyntheticFeed(depth=args.depth, seed=args.seed)
+    server = LocalBybitServer(args.host, args.port, args.rate, feed, pool_size=args.pool)
+    print(f"serving on ws://{args.host}:{args.port}/v5/public/linear at {args.rate:,.0f} msgs/s per connection", flush=True)
+    if args.stats_interval > 0:
+        threading.Thread(target=server.report_stats, args=(args.stats_interval,), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
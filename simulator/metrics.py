@@ -0,0 +1,188 @@
+from collections import deque
+from math import sqrt
+
+# Streaming PnL and risk metrics for simulated trading, updated in O(1) on each
+# fill and book tick (see AbstractStrategy.metrics). Positions are marked to the
+# mid price of their orderbook. Timestamps are in seconds, like the callbacks.
+
+
+class SeriesStats:
+    # Drawdown, rolling Sharpe ratio and a time-sampled curve of one value series
+    # (an exchange's equity or a symbol's PnL). The value is sampled at most once
+    # per sample_interval seconds; sharpe() is the mean over the standard deviation
+    # of the last `window` changes between samples (per sample, not annualized).
+    __slots__ = ("value", "peak", "max_drawdown", "sample_interval", "next_sample", "curve",
+                 "_last_sample", "_changes", "_sum", "_sum_sq")
+
+    def __init__(self, value: float, sample_interval: float, window: int):
+        self.value = value
+        self.peak = value
+        self.max_drawdown = 0
+        self.sample_interval = sample_interval
+        self.next_sample = None
+        self.curve: list[tuple[float, float]] = []  # (timestamp, value)
+        self._last_sample = value
+        self._changes = deque(maxlen=window)
+        self._sum = 0
+        self._sum_sq = 0
+
+    def update(self, value: float, timestamp: float):
+        self.value = value
+        if value > self.peak:
+            self.peak = value
+        elif self.peak - value > self.max_drawdown:
+            self.max_drawdown = self.peak - value
+        if self.next_sample is None or timestamp >= self.next_sample:
+            self._sample(timestamp)
+
+    def _sample(self, timestamp: float):
+        value = self.value
+        self.curve.append((timestamp, value))
+        change = value - self._last_sample
+        self._last_sample = value
+        changes = self._changes
+        if len(changes) == changes.maxlen:
+            dropped = changes[0]
+            self._sum -= dropped
+            self._sum_sq -= dropped * dropped
+        changes.append(change)
+        self._sum += change
+        self._sum_sq += change * change
+        self.next_sample = timestamp - timestamp % self.sample_interval + self.sample_interval
+
+    @property
+    def drawdown(self) -> float:
+        return self.peak - self.value
+
+    def sharpe(self) -> float:
+        n = len(self._changes)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        variance = self._sum_sq / n - mean * mean
+        return mean / sqrt(variance) if variance > 1e-18 else 0.0
+
+
+class SymbolMetrics:
+    __slots__ = ("position", "avg_price", "mark", "realized", "fees", "turnover", "stats")
+
+    def __init__(self, sample_interval: float, window: int):
+        self.position = 0
+        self.avg_price = 0
+        self.mark = None
+        self.realized = 0
+        self.fees = 0
+        self.turnover = 0
+        self.stats = SeriesStats(0, sample_interval, window)  # of pnl
+
+    @property
+    def unrealized(self) -> float:
+        return self.position * (self.mark - self.avg_price) if self.position else 0
+
+    @property
+    def pnl(self) -> float:  # net of fees
+        return self.realized + self.unrealized - self.fees
+
+
+class ExchangeMetrics:
+    __slots__ = ("balance", "position_value", "cost_basis", "realized", "fees", "turnover", "stats", "symbols")
+
+    def __init__(self, balance: float, sample_interval: float, window: int):
+        self.balance = balance
+        self.position_value = 0  # sum of position * mark
+        self.cost_basis = 0  # sum of position * avg_price
+        self.realized = 0
+        self.fees = 0
+        self.turnover = 0
+        self.stats = SeriesStats(balance, sample_interval, window)  # of equity
+        self.symbols: dict[str, SymbolMetrics] = dict()
+
+    @property
+    def equity(self) -> float:
+        return self.balance + self.position_value
+
+    @property
+    def unrealized(self) -> float:
+        return self.position_value - self.cost_basis
+
+
+class MetricsEngine:
+    def __init__(self, balances: dict[str, float], sample_interval: float = 60.0, window: int = 60):
+        self.sample_interval = sample_interval  # seconds between equity/PnL curve samples
+        self.window = window  # samples in the rolling Sharpe ratio
+        self.exchanges = {exchange: ExchangeMetrics(balance, sample_interval, window)
+                          for exchange, balance in balances.items()}
+
+    def symbol(self, exchange: str, symbol: str) -> SymbolMetrics:
+        symbols = self.exchanges[exchange].symbols
+        if symbol not in symbols:
+            symbols[symbol] = SymbolMetrics(self.sample_interval, self.window)
+        return symbols[symbol]
+
+    def on_fill(self, exchange: str, symbol: str, signed_size: float, price: float, fee: float,
+                balance: float, timestamp: float):
+        # balance is the exchange's cash balance after the fill (and its fee)
+        account = self.exchanges[exchange]
+        metrics = self.symbol(exchange, symbol)
+        if metrics.mark is None:
+            metrics.mark = price
+        position = metrics.position
+        new_position = position + signed_size
+        account.cost_basis -= position * metrics.avg_price
+        if position == 0 or position * signed_size > 0:  # opening or increasing
+            metrics.avg_price = (position * metrics.avg_price + signed_size * price) / new_position
+        else:
+            closed = min(abs(signed_size), abs(position))
+            realized = closed * (price - metrics.avg_price) * (1 if position > 0 else -1)
+            metrics.realized += realized
+            account.realized += realized
+            if position * new_position < 0:  # flipped sides
+                metrics.avg_price = price
+            elif new_position == 0:
+                metrics.avg_price = 0
+        metrics.position = new_position
+        account.cost_basis += new_position * metrics.avg_price
+        account.position_value += signed_size * metrics.mark
+        notional = abs(signed_size) * price
+        metrics.turnover += notional
+        account.turnover += notional
+        metrics.fees += fee
+        account.fees += fee
+        account.balance = balance
+        metrics.stats.update(metrics.pnl, timestamp)
+        account.stats.update(account.equity, timestamp)
+
+    def on_mark(self, exchange: str, symbol: str, mark: float, timestamp: float):
+        account = self.exchanges[exchange]
+        metrics = account.symbols.get(symbol)
+        if metrics is None:
+            metrics = self.symbol(exchange, symbol)
+        if metrics.position:
+            account.position_value += metrics.position * (mark - metrics.mark)
+            metrics.mark = mark
+            metrics.stats.update(metrics.pnl, timestamp)
+            account.stats.update(account.equity, timestamp)
+        else:
+            # flat: values are unchanged, only the curves may be due for a sample
+            metrics.mark = mark
+            stats = metrics.stats
+            if stats.next_sample is None or timestamp >= stats.next_sample:
+                stats.update(stats.value, timestamp)
+            stats = account.stats
+            if stats.next_sample is None or timestamp >= stats.next_sample:
+                stats.update(stats.value, timestamp)
+
+    def equity(self, exchange: str) -> float:
+        return self.exchanges[exchange].equity
+
+    def summary(self, exchange: str, symbol: str = None) -> dict:
+        if symbol is None:
+            account = self.exchanges[exchange]
+            stats = account.stats
+            values = {"equity": account.equity, "balance": account.balance, "unrealized": account.unrealized}
+        else:
+            account = self.symbol(exchange, symbol)
+            stats = account.stats
+            values = {"pnl": account.pnl, "position": account.position, "unrealized": account.unrealized}
+        return {**values, "realized": account.realized, "fees": account.fees, "turnover": account.turnover,
+                "drawdown": stats.drawdown, "max_drawdown": stats.max_drawdown, "sharpe": stats.sharpe()}
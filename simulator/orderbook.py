@@ -1,86 +1,295 @@
+import threading
+from bisect import bisect_left
+
+_MAX_CHANGES = 4096  # changed prices kept before take_changes() falls back to "everything changed"
+
+
 class Orderbook:
+    # Each side keeps a dict (price -> size) for O(1) level lookups plus a sorted
+    # list of prices ordered so that the best level is always the last element:
+    # bid prices ascending, ask prices stored negated and ascending.
+    # Inserting/removing a level is a bisect + list shift, and the best price is
+    # read from the end of the list, so it never needs a full scan.
+    #
+    # Derived features (multi-level imbalance, microprice, fill VWAP) are computed
+    # lazily and cached until the next mutation, tracked with `version`. Running
+    # top-N depth sums are only maintained after track_depth(N) is called, so
+    # books that don't use them pay nothing on delta updates.
+    #
+    # With track_changes set (see QueueFillModel), the book also remembers which
+    # prices changed since the last take_changes() call.
+    #
+    # `lock` is held by handlers while they apply updates and by market orders
+    # while they take liquidity, so that an EventPipeline can dispatch a symbol's
+    # events on another thread (see pipeline.py).
     def __init__(self, symbol):
         self.symbol = symbol
+        self.lock = threading.RLock()
         self.bids = dict()
         self.asks = dict()
+        self._bid_prices = []
+        self._ask_keys = []
+        self.best_bid = None
+        self.best_ask = None
+        self.spread = None
         self.last_update_time = None
-    
+        self.version = 0  # incremented on every mutation
+        self._depth_levels = 0
+        self._bid_total = 0
+        self._ask_total = 0
+        self._features = dict()
+        self._features_version = 0
+        self.track_changes = False
+        self._changed_bids = []
+        self._changed_asks = []
+        self._changed_all = False
+
     def delta_update(self, bids, asks, timestamp):
-        for price, size in bids:
-            if size == 0 and price in self.bids:    
-                del self.bids[price]
-            else:
-                self.bids[price] = size
-        
-        for price, size in asks:
-            if size == 0 and price in self.asks:
-                del self.asks[price]
-            else:
-                self.asks[price] = size
-        
+        if self.track_changes and not self._changed_all:
+            bids = list(bids)
+            asks = list(asks)
+            self._changed_bids += [price for price, _ in bids]
+            self._changed_asks += [price for price, _ in asks]
+            if len(self._changed_bids) + len(self._changed_asks) > _MAX_CHANGES:
+                self._changed_all = True
+        if self._depth_levels:
+            self._bid_total = self._apply_tracked(self.bids, self._bid_prices, bids, 1, self._bid_total)
+            self._ask_total = self._apply_tracked(self.asks, self._ask_keys, asks, -1, self._ask_total)
+        else:
+            self._apply_levels(self.bids, self._bid_prices, bids, 1)
+            self._apply_levels(self.asks, self._ask_keys, asks, -1)
         self.last_update_time = timestamp
-        self.best_ask = min(self.asks.keys())
-        self.best_bid = max(self.bids.keys())
-        self.spread = self.best_ask - self.best_bid
+        self.version += 1
+        self._update_best()
 
     def update(self, bids, asks, timestamp):
         self.bids = dict()
         self.asks = dict()
         for price, size in bids:
-            if size == 0 and price in self.bids:    
-                del self.bids[price]
-            else:
+            if size != 0:
                 self.bids[price] = size
-        
+
         for price, size in asks:
-            if size == 0 and price in self.asks:
-                del self.asks[price]
-            else:
+            if size != 0:
                 self.asks[price] = size
-        
+
+        self._bid_prices = sorted(self.bids)
+        self._ask_keys = sorted(-price for price in self.asks)
         self.last_update_time = timestamp
-        self.best_ask = min(self.asks.keys())
-        self.best_bid = max(self.bids.keys())
-        self.spread = self.best_ask - self.best_bid
-    
-    def imbalance(self):
-        return (self.bids[self.best_bid] - self.asks[self.best_ask]) / (self.asks[self.best_ask] + self.bids[self.best_bid])
-    
+        self.version += 1
+        self._changed_all = self.track_changes
+        self._reset_depth()
+        self._update_best()
+
+    @staticmethod
+    def _apply_levels(levels, keys, updates, sign):
+        # keys holds sign * price for every level, sorted ascending
+        for price, size in updates:
+            if size == 0:
+                if price in levels:
+                    del levels[price]
+                    del keys[bisect_left(keys, sign * price)]
+            else:
+                if price not in levels:
+                    key = sign * price
+                    if not keys or key > keys[-1]:
+                        keys.append(key)
+                    else:
+                        keys.insert(bisect_left(keys, key), key)
+                levels[price] = size
+
+    def _apply_tracked(self, levels, keys, updates, sign, total):
+        # Same as _apply_levels, also keeping `total` = size of the best n levels.
+        # Only changed levels and the one crossing the top-n boundary are touched.
+        n = self._depth_levels
+        for price, size in updates:
+            key = sign * price
+            old = levels.get(price)
+            if size == 0:
+                if old is None:
+                    continue
+                index = bisect_left(keys, key)
+                in_top = index >= len(keys) - n
+                del levels[price]
+                del keys[index]
+                if in_top:
+                    total -= old
+                    if len(keys) >= n:  # the next level moves into the top n
+                        total += levels[sign * keys[-n]]
+            elif old is None:
+                index = bisect_left(keys, key)
+                keys.insert(index, key)
+                levels[price] = size
+                if index >= len(keys) - n:
+                    total += size
+                    if len(keys) > n:  # the old n-th level drops out
+                        total -= levels[sign * keys[-n - 1]]
+            else:
+                levels[price] = size
+                if len(keys) <= n or key >= keys[-n]:
+                    total += size - old
+        return total
+
+    def _reset_depth(self):
+        n = self._depth_levels
+        if n:
+            self._bid_total = sum(self.bids[price] for price in self._bid_prices[-n:])
+            self._ask_total = sum(self.asks[-key] for key in self._ask_keys[-n:])
+
+    def take_changes(self) -> tuple[list[float], list[float]]:
+        # (bid prices, ask prices) changed since the last call (possibly repeated),
+        # or None if the whole book may have changed (snapshot, too many changes)
+        if self._changed_all:
+            changes = None
+        else:
+            changes = (self._changed_bids, self._changed_asks)
+        self._changed_bids = []
+        self._changed_asks = []
+        self._changed_all = False
+        return changes
+
+    def track_depth(self, levels: int):
+        # maintains running sums of the best `levels` levels of each side (0 turns it off)
+        self._depth_levels = max(levels, 0)
+        self._reset_depth()
+        self.version += 1
+
+    def _update_best(self):
+        best_bid = self._bid_prices[-1] if self._bid_prices else None
+        best_ask = -self._ask_keys[-1] if self._ask_keys else None
+        if best_bid != self.best_bid or best_ask != self.best_ask:
+            self.best_bid = best_bid
+            self.best_ask = best_ask
+            if best_bid is not None and best_ask is not None:
+                self.spread = best_ask - best_bid
+            else:
+                self.spread = None
+
+    def _cached(self, key):
+        if self._features_version != self.version:
+            self._features.clear()
+            self._features_version = self.version
+        return self._features.get(key)
+
+    def top_depth(self, levels: int) -> tuple[float, float]:  # (bid size, ask size) of the best `levels` levels
+        if levels == self._depth_levels:
+            return self._bid_total, self._ask_total
+        depth = self._cached(("depth", levels))
+        if depth is None:
+            depth = (sum(self.bids[price] for price in self._bid_prices[-levels:]),
+                     sum(self.asks[-key] for key in self._ask_keys[-levels:])) if levels > 0 else (0, 0)
+            self._features[("depth", levels)] = depth
+        return depth
+
+    def imbalance(self, levels: int = 1):
+        if levels == 1:
+            return (self.bids[self.best_bid] - self.asks[self.best_ask]) / (self.asks[self.best_ask] + self.bids[self.best_bid])
+        bid_size, ask_size = self.top_depth(levels)
+        return (bid_size - ask_size) / (bid_size + ask_size)
+
+    def microprice(self) -> float:  # mid weighted towards the side with less size at the touch
+        microprice = self._cached("microprice")
+        if microprice is None:
+            bid_size, ask_size = self.bids[self.best_bid], self.asks[self.best_ask]
+            microprice = (self.best_bid * ask_size + self.best_ask * bid_size) / (bid_size + ask_size)
+            self._features["microprice"] = microprice
+        return microprice
+
+    def fill_vwap(self, size: float) -> float:
+        # average price a market order of `size` (buy > 0) would get, without
+        # touching the book; None if the side is empty
+        if size == 0:
+            return self.mid_price()
+        vwap = self._cached(("vwap", size))
+        if vwap is None:
+            if size > 0:
+                levels = ((-key, self.asks[-key]) for key in reversed(self._ask_keys))
+            else:
+                levels = ((price, self.bids[price]) for price in reversed(self._bid_prices))
+            remaining_size = abs(size)
+            raw_sum = 0
+            for price, level_size in levels:
+                filled = min(level_size, remaining_size)
+                raw_sum += price * filled
+                remaining_size -= filled
+                if remaining_size <= 0:
+                    break
+            if remaining_size >= abs(size):
+                return None
+            vwap = raw_sum / (abs(size) - remaining_size)
+            self._features[("vwap", size)] = vwap
+        return vwap
+
     def mid_price(self):
         return (self.best_ask + self.best_bid) / 2
-    
-    def fill_order(self, size: float) -> float: # returns average price of filled size
+
+    def top_bids(self, n: int) -> list[tuple[float, float]]:  # best first
+        return [(price, self.bids[price]) for price in self._bid_prices[:-n - 1:-1]] if n > 0 else []
+
+    def top_asks(self, n: int) -> list[tuple[float, float]]:  # best first
+        return [(-key, self.asks[-key]) for key in self._ask_keys[:-n - 1:-1]] if n > 0 else []
+
+    def bid_depth(self, price: float) -> float:  # total bid size at prices >= price
+        return sum(self.bids[p] for p in self._bid_prices[bisect_left(self._bid_prices, price):])
+
+    def ask_depth(self, price: float) -> float:  # total ask size at prices <= price
+        return sum(self.asks[-key] for key in self._ask_keys[bisect_left(self._ask_keys, -price):])
+
+    def fill_order(self, size: float) -> float:  # returns average price of filled size
+        return self.take_liquidity(size)[0]
+
+    def take_liquidity(self, size: float) -> tuple[float, float]:
+        # Like fill_order, but also returns the (unsigned) size actually filled,
+        # which is less than abs(size) when the side runs out; the price is None
+        # if nothing was filled.
         raw_sum = 0
         if (size > 0):
             remaining_size = size
-            while (remaining_size > 0):
-                if (self.asks[self.best_ask] >= remaining_size):
-                    raw_sum += self.best_ask * remaining_size
+            while (remaining_size > 0 and self._ask_keys):
+                price = -self._ask_keys[-1]
+                level_size = self.asks[price]
+                if self.track_changes:
+                    self._changed_asks.append(price)
+                if (level_size > remaining_size):
+                    raw_sum += price * remaining_size
+                    self.asks[price] = level_size - remaining_size
                     remaining_size = 0
                 else:
-                    raw_sum += self.best_ask * self.asks[self.best_ask]
-                    remaining_size -= self.asks[self.best_ask]
-                    del self.asks[self.best_ask]
-                self.best_ask = min(self.asks.keys())
-            return raw_sum / size
+                    raw_sum += price * level_size
+                    remaining_size -= level_size
+                    del self.asks[price]
+                    self._ask_keys.pop()
+            self.version += 1
+            self._reset_depth()
+            self._update_best()
+            filled = size - remaining_size
+            return (raw_sum / filled if filled > 0 else None), filled
         elif (size < 0):
             remaining_size = -size
-            while (remaining_size > 0):
-                if (self.bids[self.best_bid] >= remaining_size):
-                    raw_sum += self.best_bid * remaining_size
+            while (remaining_size > 0 and self._bid_prices):
+                price = self._bid_prices[-1]
+                level_size = self.bids[price]
+                if self.track_changes:
+                    self._changed_bids.append(price)
+                if (level_size > remaining_size):
+                    raw_sum += price * remaining_size
+                    self.bids[price] = level_size - remaining_size
                     remaining_size = 0
                 else:
-                    raw_sum += self.best_bid * self.bids[self.best_bid]
-                    remaining_size -= self.bids[self.best_bid]
-                    del self.bids[self.best_bid]
-                self.best_bid = max(self.bids.keys())
+                    raw_sum += price * level_size
+                    remaining_size -= level_size
+                    del self.bids[price]
+                    self._bid_prices.pop()
+            self.version += 1
+            self._reset_depth()
+            self._update_best()
+            filled = -size - remaining_size
+            return (raw_sum / filled if filled > 0 else None), filled
         else:
-            return self.mid_price()
-            
+            return self.mid_price(), 0
 
-    
     def __str__(self) -> str:
         result = f"{self.symbol} (Spread: {self.spread:.2} - Imbalance: {self.imbalance():.3f})\n"
-        for bidPrice, askPrice in zip(sorted(self.bids.keys(), reverse=True), sorted(self.asks.keys())):
-            result += f"{bidPrice:10.2f} {self.bids[bidPrice]:10.4f} | {self.asks[askPrice]:10.4f} {askPrice:10.2f}\n"
-        return result
\ No newline at end of file
+        for (bidPrice, bidSize), (askPrice, askSize) in zip(self.top_bids(len(self.bids)), self.top_asks(len(self.asks))):
+            result += f"{bidPrice:10.2f} {bidSize:10.4f} | {askSize:10.4f} {askPrice:10.2f}\n"
+        return result
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from collections import deque
+from enum import Enum
+
+from .abstract_strategy import AbstractStrategy
+
+
+class BackpressurePolicy(Enum):
+    BLOCK = "block"            # the handler's thread waits until the symbol's queue has room
+    DROP_STALE = "drop_stale"  # the oldest queued orderbook update of the symbol is dropped to make room
+    COALESCE = "coalesce"      # at most one orderbook update per symbol is queued, later ones replace it
+
+
+class _SymbolQueue:
+    __slots__ = ("events", "book_event", "pushed", "dropped", "coalesced", "blocked", "max_depth")
+
+    def __init__(self):
+        self.events = deque()  # [callback, args]
+        self.book_event = None  # latest queued orderbook update, if any
+        self.pushed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.max_depth = 0
+
+
+class EventPipeline:
+    # Decouples exchange handlers from the strategy. Handlers are started with the
+    # pipeline in place of the strategy: their callbacks only enqueue the event in a
+    # bounded per-symbol queue and return, and an asyncio loop dispatches the queued
+    # events to the strategy, round-robin across symbols so that a busy symbol
+    # cannot starve the others.
+    #
+    # Orderbooks are still updated in full by the handlers as messages arrive, so a
+    # strategy always sees the latest book when an orderbook update is dispatched.
+    # This is what makes dropping or coalescing orderbook updates safe; the other
+    # event types are never dropped.
+    #
+    # Threading: handler threads only touch a book while holding its `lock`, and
+    # every event of a symbol is dispatched with that symbol's book lock held, so
+    # matching, fills and the strategy callbacks never see a half-applied update
+    # and the book cannot change under them. Orderbook updates are dispatched with
+    # the book's own last_update_time (which may be newer than when the event was
+    # queued), so fills are always evaluated against the book at that time. Books
+    # of other symbols read from a callback should be accessed under their lock too.
+    def __init__(self, strategy: AbstractStrategy, maxsize: int = 10_000,
+                 policy: BackpressurePolicy = BackpressurePolicy.BLOCK, batch_size: int = 64):
+        self.strategy = strategy
+        self._book_callback = strategy._on_orderbook_update
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch_size = batch_size  # events dispatched per symbol before moving on to the next one
+        self._queues: dict[str, _SymbolQueue] = dict()
+        self._ready = deque()  # symbols with queued events, in dispatch order
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._loop = None
+        self._wakeup = None
+        self._running = False
+
+    # callbacks called by the exchange handlers
+
+    def _on_orderbook_update(self, symbol, exchange, orderbook, timestamp):
+        self._push(symbol, self._book_callback, (symbol, exchange, orderbook, timestamp), True)
+
+    def _on_trade(self, symbol, exchange, side, price, size, timestamp):
+        self._push(symbol, self.strategy._on_trade, (symbol, exchange, side, price, size, timestamp), False)
+
+    def _on_candle_update(self, symbol, exchange, candle, timestamp, confirmed):
+        self._push(symbol, self.strategy._on_candle_update, (symbol, exchange, candle, timestamp, confirmed), False)
+
+    def _on_liquidation(self, symbol, exchange, side, price, size, timestamp):
+        self._push(symbol, self.strategy._on_liquidation, (symbol, exchange, side, price, size, timestamp), False)
+
+    def _push(self, symbol: str, callback, args: tuple, book: bool):
+        with self._lock:
+            queue = self._queues.get(symbol)
+            if queue is None:
+                queue = self._queues[symbol] = _SymbolQueue()
+            queue.pushed += 1
+            if book and self.policy is BackpressurePolicy.COALESCE and queue.book_event is not None:
+                queue.book_event[1] = args
+                queue.coalesced += 1
+                return
+
+            events = queue.events
+            if len(events) >= self.maxsize and self.policy is BackpressurePolicy.DROP_STALE:
+                stale = next((event for event in events if event[0] is self._book_callback), None)
+                if stale is not None:
+                    events.remove(stale)
+                    queue.dropped += 1
+                    if stale is queue.book_event:
+                        queue.book_event = None
+            if len(events) >= self.maxsize:
+                queue.blocked += 1
+                while len(events) >= self.maxsize and self._running:
+                    self._not_full.wait(0.1)
+
+            event = [callback, args]
+            events.append(event)
+            if book:
+                queue.book_event = event
+            if len(events) > queue.max_depth:
+                queue.max_depth = len(events)
+            if len(events) == 1:
+                self._ready.append(symbol)
+                if len(self._ready) == 1 and self._loop is not None:
+                    self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # metrics
+
+    def queue_depths(self) -> dict[str, int]:
+        with self._lock:
+            return {symbol: len(queue.events) for symbol, queue in self._queues.items()}
+
+    def metrics(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {symbol: {"depth": len(queue.events), "max_depth": queue.max_depth, "pushed": queue.pushed,
+                             "dropped": queue.dropped, "coalesced": queue.coalesced, "blocked": queue.blocked}
+                    for symbol, queue in self._queues.items()}
+
+    # running
+
+    async def run(self, until_idle=None):
+        # Dispatches queued events until stop() is called, or until `until_idle()`
+        # returns True while every queue is empty.
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._running = True
+            if self._ready:
+                self._wakeup.set()
+        try:
+            while self._running:
+                if until_idle is None:
+                    await self._wakeup.wait()
+                else:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), 0.1)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+                while True:
+                    with self._lock:
+                        if not self._ready:
+                            break
+                        symbol = self._ready.popleft()
+                        queue = self._queues[symbol]
+                        events = queue.events
+                        batch = [events.popleft() for _ in range(min(self.batch_size, len(events)))]
+                        if queue.book_event is not None and any(event is queue.book_event for event in batch):
+                            queue.book_event = None
+                        if events:
+                            self._ready.append(symbol)
+                        self._not_full.notify_all()
+                    for callback, args in batch:
+                        orderbook = args[1].orderbook(symbol)
+                        with orderbook.lock:
+                            if callback is self._book_callback:
+                                args = (symbol, args[1], orderbook, orderbook.last_update_time)
+                            callback(*args)
+                    await asyncio.sleep(0)
+                if until_idle is not None and until_idle():
+                    with self._lock:
+                        if not self._ready:
+                            break
+        finally:
+            with self._lock:
+                self._running = False
+                self._loop = None
+                self._not_full.notify_all()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            self._not_full.notify_all()
+
+    def start(self, until_exhausted: bool = False):
+        # Like AbstractStrategy.start, but with the handlers feeding the pipeline.
+        # Blocks until stop() is called, or, with until_exhausted, until every
+        # handler's run() has returned (replay) and all queued events are dispatched.
+        for exchange_handler in self.strategy.exchange_handlers.values():
+            exchange_handler.start(self)
+        self.strategy._on_ready()
+        self._running = True
+        runners = [threading.Thread(target=exchange_handler.run, daemon=True)
+                   for exchange_handler in self.strategy.exchange_handlers.values()]
+        for runner in runners:
+            runner.start()
+        until_idle = (lambda: not any(runner.is_alive() for runner in runners)) if until_exhausted else None
+        asyncio.run(self.run(until_idle))
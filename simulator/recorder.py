@@ -0,0 +1,38 @@
+import gzip
+import json
+import threading
+import time
+
+
+class Recorder:
+    # Appends every raw message that reaches a handler's update_* callbacks to a
+    # gzip-compressed JSON lines file: [receive_time_ns, channel, message]
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, channel: str, data):
+        line = json.dumps([time.time_ns(), channel, data], separators=(",", ":"))
+        with self._lock:
+            self._file.write(line)
+            self._file.write("\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path: str, channel: str = None, contains: str = None):
+    # yields (receive_time_ns, channel, message) in recorded order; with `channel`
+    # and/or `contains`, lines of other channels or without that text are skipped
+    # before being decoded
+    token = None if channel is None else f',"{channel}",'
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if token is not None and token not in line[:64]:
+                continue
+            if contains is not None and contains not in line:
+                continue
+            receive_time, channel_name, data = json.loads(line)
+            yield receive_time, channel_name, data
@@ -0,0 +1,81 @@
+from enum import IntEnum
+
+
+class Side(IntEnum):
+    BUY = 1
+    SELL = -1
+
+    @staticmethod
+    def parse(side) -> "Side":
+        # accepts a Side or Bybit's "Buy"/"Sell"
+        if isinstance(side, Side):
+            return side
+        try:
+            return _SIDES[side]
+        except KeyError:
+            raise ValueError(f"invalid side: {side!r}") from None
+
+
+class OrderStatus(IntEnum):
+    NEW = 0
+    FILLED = 1
+    CANCELLED = 2
+
+
+class TimeInForce(IntEnum):
+    GTC = 0
+    IOC = 1
+    FOK = 2
+    POST_ONLY = 3
+
+    @staticmethod
+    def parse(time_in_force) -> "TimeInForce":
+        # accepts a TimeInForce or Bybit's "GTC"/"IOC"/"FOK"/"PostOnly"
+        if isinstance(time_in_force, TimeInForce):
+            return time_in_force
+        try:
+            return _TIME_IN_FORCES[time_in_force]
+        except KeyError:
+            raise ValueError(f"invalid time in force: {time_in_force!r}") from None
+
+
+class OrderType(IntEnum):
+    MARKET = 0
+    LIMIT = 1
+
+
+_SIDES = {"Buy": Side.BUY, "Sell": Side.SELL}
+_TIME_IN_FORCES = {"GTC": TimeInForce.GTC, "IOC": TimeInForce.IOC, "FOK": TimeInForce.FOK, "PostOnly": TimeInForce.POST_ONLY}
+
+
+class Order:
+    __slots__ = ("price", "size", "side", "symbol", "exchange", "order_id", "time_in_force", "status", "order_type")
+
+    def __init__(self, price: float, size: float, side: Side, symbol: str, exchange: str, order_id: int,
+                 time_in_force: TimeInForce, status: OrderStatus, order_type: OrderType):
+        self.price = price
+        self.size = size
+        self.side = side
+        self.symbol = symbol
+        self.exchange = exchange
+        self.order_id = order_id
+        self.time_in_force = time_in_force
+        self.status = status
+        self.order_type = order_type
+
+    def __repr__(self) -> str:
+        return (f"Order({self.order_id}, {self.order_type.name} {self.side.name} {self.size} {self.symbol}@{self.exchange} "
+                f"at {self.price}, {self.time_in_force.name}, {self.status.name})")
+
+
+class Position:
+    __slots__ = ("size", "avg_price", "symbol", "exchange")
+
+    def __init__(self, size: float, avg_price: float, symbol: str, exchange: str):
+        self.size = size  # negative when short
+        self.avg_price = avg_price
+        self.symbol = symbol
+        self.exchange = exchange
+
+    def __repr__(self) -> str:
+        return f"Position({self.size} {self.symbol}@{self.exchange} at {self.avg_price})"
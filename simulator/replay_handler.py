@@ -0,0 +1,127 @@
+import heapq
+
+import numpy as np
+
+from .bybit_decoder import topic_symbol
+from .bybit_handler import BybitHandler
+from .exchange_handler import ExchangeHandler
+from .recorder import read_recording
+from .tick_store import SIDE_NAMES, TickStore, interval_name
+
+
+class ReplayHandler(BybitHandler):
+    # Feeds recorded Bybit messages back through the same update_* callbacks as
+    # the live handler, without a websocket and as fast as possible.
+    def __init__(self, paths: list[str], symbols: set[str], orderbook_depth: int = 50):
+        super().__init__(api_key=None, api_secret=None, symbols=symbols,
+                         orderbook_depth=orderbook_depth, kline_intervals={})
+        self.paths = list(paths)
+
+    def start(self, strategy):
+        ExchangeHandler.start(self, strategy)
+
+    def messages(self):
+        # yields (channel, message) for the handler's symbols, in recorded order
+        for path in self.paths:
+            for _, channel, data in read_recording(path):
+                if topic_symbol(data["topic"]) in self.symbols:
+                    yield channel, data
+
+    def run(self):
+        callbacks = self._callbacks
+        for channel, data in self.messages():
+            callbacks[channel](data)
+
+    def _topic_events(self, channel: str, symbol: str):
+        # one channel of one symbol, in recorded order. Exchange timestamps are
+        # only ordered within a topic (not across topics, which arrive over
+        # different paths), and one that still goes back is clamped to the
+        # previous one, so the stream is in timestamp order.
+        callback = self._callbacks[channel]
+        kind = _CHANNEL_KINDS[channel]
+        last = 0
+        for path in self.paths:
+            for _, _, data in read_recording(path, channel, symbol):
+                if topic_symbol(data["topic"]) == symbol:
+                    last = max(last, data["ts"])
+                    yield last, kind, callback, (data,)
+
+    def events(self):
+        # recorded messages by their exchange timestamp: every channel and symbol
+        # is read as its own stream and the streams are merged, like StoreReplayHandler
+        streams = [self._topic_events(channel, symbol)
+                   for symbol in sorted(self.symbols) for channel in _CHANNEL_KINDS]
+        return heapq.merge(*streams, key=lambda event: (event[0], event[1]))
+
+
+# same event kinds as StoreReplayHandler: book, trade, candle, liquidation
+_CHANNEL_KINDS = {"orderbook": 0, "trade": 1, "candle": 2, "liquidation": 3}
+
+
+def _rows(table: dict, columns: tuple[str, ...], start: int, end: int, chunk_size: int = 1 << 14):
+    # iterates rows [start, end) of a tick store table, converting one chunk at a time
+    for chunk_start in range(start, end, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, end)
+        yield from zip(*(table[column][chunk_start:chunk_end].tolist() for column in columns))
+
+
+class StoreReplayHandler(ExchangeHandler):
+    # Replays a tick store (see tick_store.py) between `start` and `end`
+    # (exchange timestamps in ms). Books are seeded from the nearest checkpoint
+    # before `start`, so replay can begin anywhere in the file.
+    def __init__(self, root: str, symbols: set[str], start: int = None, end: int = None, name: str = "Bybit"):
+        super().__init__(name=name, symbols=symbols)
+        self.stores = {symbol: TickStore(root, symbol) for symbol in self.symbols}
+        self.start_time = start
+        self.end_time = end
+
+    def _range(self, ts):
+        start = 0 if self.start_time is None else int(np.searchsorted(ts, self.start_time, side="left"))
+        end = len(ts) if self.end_time is None else int(np.searchsorted(ts, self.end_time, side="right"))
+        return start, end
+
+    def _book_events(self, symbol: str, store: TickStore):
+        if self.start_time is None:
+            i = 0
+        else:
+            _, i = store.orderbook_at(self.start_time - 1, self.orderbook(symbol))
+        end = len(store.book["ts"]) if self.end_time is None else store.book_index(self.end_time)
+        for seq, (ts,) in enumerate(_rows(store.book, ("ts",), i, end), i):
+            yield ts, 0, self._book_event, (symbol, store, seq)
+
+    def _book_event(self, symbol: str, store: TickStore, i: int):
+        orderbook = self.orderbook(symbol)
+        with orderbook.lock:
+            store.apply(orderbook, i)
+        self.strategy._on_orderbook_update(symbol=symbol, exchange=self, orderbook=orderbook,
+                                           timestamp=orderbook.last_update_time)
+
+    def _trade_events(self, symbol: str, store: TickStore):
+        start, end = self._range(store.trade["ts"])
+        for ts, side, price, size in _rows(store.trade, ("ts", "side", "price", "size"), start, end):
+            yield ts, 1, self.strategy._on_trade, (symbol, self, SIDE_NAMES[side], price, size, ts / 1000)
+
+    def _candle_events(self, symbol: str, store: TickStore):
+        start, end = self._range(store.candle["ts"])
+        columns = ("ts", "start", "end", "interval", "open", "high", "low", "close", "volume", "turnover", "confirmed")
+        for ts, start_ts, end_ts, interval, open, high, low, close, volume, turnover, confirmed in _rows(store.candle, columns, start, end):
+            candle_data = (start_ts / 1000, end_ts / 1000, interval_name(interval), open, high,
+                           low, close, volume, turnover)
+            yield ts, 2, self.strategy._on_candle_update, (symbol, self, candle_data, ts / 1000, bool(confirmed))
+
+    def _liquidation_events(self, symbol: str, store: TickStore):
+        start, end = self._range(store.liquidation["ts"])
+        for ts, side, price, size in _rows(store.liquidation, ("ts", "side", "price", "size"), start, end):
+            yield ts, 3, self.strategy._on_liquidation, (symbol, self, SIDE_NAMES[side], price, size, ts / 1000)
+
+    def events(self):
+        # (ts, kind, callback, args) for every symbol and event type, merged by timestamp
+        streams = []
+        for symbol, store in sorted(self.stores.items()):
+            streams += [self._book_events(symbol, store), self._trade_events(symbol, store),
+                        self._candle_events(symbol, store), self._liquidation_events(symbol, store)]
+        return heapq.merge(*streams, key=lambda event: (event[0], event[1]))
+
+    def run(self):
+        for _, _, callback, args in self.events():
+            callback(*args)
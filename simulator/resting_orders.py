@@ -0,0 +1,92 @@
+from bisect import bisect_left
+
+from .records import Order, Side
+
+
+class RestingOrders:
+    # Simulated resting limit orders of one symbol, indexed by side and price.
+    # Like Orderbook, each side keeps a dict of levels (price -> {order_id: order},
+    # in arrival order) and a sorted list of prices with the most aggressive level
+    # last: buy prices ascending, sell prices stored negated and ascending.
+    # Adding/cancelling is O(log n) and matching only touches crossed levels.
+    def __init__(self):
+        self.orders: dict[int, Order] = dict()
+        self._buy_levels = dict()
+        self._sell_levels = dict()
+        self._buy_prices = []
+        self._sell_keys = []
+        self.queue_ahead = dict()  # order_id -> size ahead in the queue (maintained by the fill model)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def _side(self, side: Side):
+        if side == Side.BUY:
+            return self._buy_levels, self._buy_prices, 1
+        return self._sell_levels, self._sell_keys, -1
+
+    def add(self, order: Order):
+        order_id, price = order.order_id, order.price
+        levels, keys, sign = self._side(order.side)
+        level = levels.get(price)
+        if level is None:
+            level = levels[price] = dict()
+            key = sign * price
+            if not keys or key > keys[-1]:
+                keys.append(key)
+            else:
+                keys.insert(bisect_left(keys, key), key)
+        level[order_id] = order
+        self.orders[order_id] = order
+
+    def remove(self, order_id: int) -> Order:
+        # removes and returns the order, or None if it is not resting
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        self.queue_ahead.pop(order_id, None)
+        levels, keys, sign = self._side(order.side)
+        level = levels[order.price]
+        del level[order_id]
+        if not level:
+            del levels[order.price]
+            del keys[bisect_left(keys, sign * order.price)]
+        return order
+
+    def level(self, side: Side, price: float) -> dict:
+        # resting orders (order_id -> order) at one price, in arrival order
+        return self._side(side)[0].get(price, {})
+
+    def levels(self, side: Side) -> dict:
+        # price -> resting orders at that price
+        return self._side(side)[0]
+
+    def clear(self) -> list[Order]:
+        orders = list(self.orders.values())
+        self.__init__()
+        return orders
+
+    def best_buy(self):
+        return self._buy_prices[-1] if self._buy_prices else None
+
+    def best_sell(self):
+        return -self._sell_keys[-1] if self._sell_keys else None
+
+    def crossed(self, best_bid: float, best_ask: float, inclusive: bool = True) -> list[Order]:
+        # Removes and returns the orders the book has crossed: buys priced at or
+        # above the best ask and sells priced at or below the best bid (strictly
+        # above/below if not inclusive).
+        filled = []
+        if best_ask is not None:
+            while self._buy_prices and (self._buy_prices[-1] >= best_ask if inclusive else self._buy_prices[-1] > best_ask):
+                self._pop_level(self._buy_levels.pop(self._buy_prices.pop()), filled)
+        if best_bid is not None:
+            while self._sell_keys and (-self._sell_keys[-1] <= best_bid if inclusive else -self._sell_keys[-1] < best_bid):
+                self._pop_level(self._sell_levels.pop(-self._sell_keys.pop()), filled)
+        return filled
+
+    def _pop_level(self, level: dict, filled: list):
+        for order_id, order in level.items():
+            del self.orders[order_id]
+            self.queue_ahead.pop(order_id, None)
+            filled.append(order)
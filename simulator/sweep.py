@@ -0,0 +1,103 @@
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .abstract_strategy import AbstractStrategy
+from .replay_handler import StoreReplayHandler
+from .tick_store import TickStore
+
+# Runs one backtest per point of a parameter grid over a tick store, spread over a
+# process pool. Each worker opens the store through numpy.memmap, so all workers
+# share the same page-cache copy of the market data.
+#
+# The strategy class is instantiated as strategy_class(exchange_handlers=..., **params).
+# A "symbol" entry in the grid selects which symbol of the store a run replays.
+
+_FIELDS = ["params", "equity", "pnl", "fills", "fees", "max_drawdown", "sharpe", "elapsed"]
+
+
+def grid_points(grid: dict[str, list]) -> list[dict]:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def _run_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _run(strategy_class: type[AbstractStrategy], params: dict, store_root: str, symbols: set[str],
+         start: int, end: int, exchange: str) -> dict:
+    started = time.perf_counter()
+    run_symbols = {params["symbol"]} if "symbol" in params else symbols
+    handler = StoreReplayHandler(store_root, run_symbols, start=start, end=end, name=exchange)
+    strategy = strategy_class(exchange_handlers={exchange: handler}, **params)
+    initial_balance = strategy.get_balance(exchange)
+    strategy.start()
+    equity = strategy.get_equity(exchange)
+    account = strategy.metrics.exchanges[exchange]
+    return {"params": params, "equity": equity, "pnl": equity - initial_balance, "fills": strategy.fill_count,
+            "fees": account.fees, "max_drawdown": account.stats.max_drawdown, "sharpe": account.stats.sharpe(),
+            "elapsed": time.perf_counter() - started, "curve": account.stats.curve}
+
+
+def load_results(results_path: str) -> list[dict]:
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, newline="") as f:
+        # files from before fees/drawdown/sharpe were recorded read them as 0
+        return [{"params": json.loads(row["params"]), "equity": float(row["equity"]),
+                 "pnl": float(row["pnl"]), "fills": int(row["fills"]), "fees": float(row.get("fees") or 0),
+                 "max_drawdown": float(row.get("max_drawdown") or 0), "sharpe": float(row.get("sharpe") or 0),
+                 "elapsed": float(row["elapsed"])}
+                for row in csv.DictReader(f)]
+
+
+def _print_progress(done: int, total: int, result: dict):
+    print(f"[{done}/{total}] {_run_key(result['params'])} pnl={result['pnl']:.4f} fills={result['fills']} ({result['elapsed']:.1f}s)")
+
+
+def run_sweep(strategy_class: type[AbstractStrategy], grid: dict[str, list], store_root: str, symbols: set[str] = None,
+              start: int = None, end: int = None, results_path: str = "sweep_results.csv",
+              max_workers: int = None, exchange: str = "Bybit", progress=_print_progress,
+              curves_path: str = None) -> list[dict]:
+    # Results are appended to results_path as each run finishes; runs already
+    # present in the file are skipped, so an interrupted sweep can be resumed by
+    # calling run_sweep again with the same arguments.
+    # With curves_path, each run's sampled equity curve is appended to it as a
+    # JSON line {"params": ..., "curve": [[timestamp, equity], ...]}.
+    # Without a "symbol" grid entry, runs replay `symbols` (every symbol of the store if None).
+    if symbols is None and "symbol" not in grid:
+        symbols = set(TickStore.list_symbols(store_root))
+        if not symbols:
+            raise ValueError(f"No symbols found in tick store {store_root}")
+    results = load_results(results_path)
+    completed = {_run_key(result["params"]) for result in results}
+    pending = [params for params in grid_points(grid) if _run_key(params) not in completed]
+    total = len(completed) + len(pending)
+
+    new_file = not os.path.exists(results_path)
+    fields = _FIELDS
+    if not new_file:
+        with open(results_path, newline="") as f:
+            fields = next(csv.reader(f), _FIELDS)  # keep the columns of an existing file
+    with open(results_path, "a", newline="") as f, ProcessPoolExecutor(max_workers=max_workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        futures = [executor.submit(_run, strategy_class, params, store_root, symbols, start, end, exchange)
+                   for params in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            curve = result.pop("curve")
+            writer.writerow({**result, "params": _run_key(result["params"])})
+            f.flush()
+            if curves_path is not None:
+                with open(curves_path, "a") as curves:
+                    curves.write(json.dumps({"params": result["params"], "curve": curve}, default=str) + "\n")
+            results.append(result)
+            if progress is not None:
+                progress(len(results), total, result)
+    return results
@@ -0,0 +1,250 @@
+import json
+import os
+from array import array
+
+import numpy as np
+
+from .bybit_decoder import topic_symbol
+from .orderbook import Orderbook
+from .recorder import read_recording
+
+# On-disk layout: one directory per symbol, one raw binary file per column
+# ("<table>_<column>.bin", native byte order) and a meta.json holding the row
+# count of every table. Book messages index into the level columns, which hold
+# the bids followed by the asks of each message. Checkpoints hold the full book
+# after message `message - 1`, so seeking only has to apply the deltas after it.
+_TABLES = {
+    "book": {"ts": "q", "start": "q", "asks": "q", "snapshot": "B"},
+    "level": {"side": "b", "price": "d", "size": "d"},
+    "trade": {"ts": "q", "side": "b", "price": "d", "size": "d"},
+    "candle": {"ts": "q", "start": "q", "end": "q", "interval": "q", "open": "d", "high": "d",
+               "low": "d", "close": "d", "volume": "d", "turnover": "d", "confirmed": "B"},
+    "liquidation": {"ts": "q", "side": "b", "price": "d", "size": "d"},
+    "checkpoint": {"ts": "q", "message": "q", "start": "q", "asks": "q"},
+    "checkpoint_level": {"side": "b", "price": "d", "size": "d"},
+}
+
+BID, ASK = 1, -1
+BUY, SELL = 1, -1
+_SIDES = {"Buy": BUY, "Sell": SELL}
+SIDE_NAMES = {BUY: "Buy", SELL: "Sell"}
+
+# kline intervals are stored as minutes
+_INTERVALS = {"D": 1440, "W": 10080, "M": 43200}
+INTERVAL_NAMES = {minutes: name for name, minutes in _INTERVALS.items()}
+
+
+def interval_name(minutes: int) -> str:
+    return INTERVAL_NAMES.get(minutes, str(minutes))
+
+
+class _SymbolWriter:
+    def __init__(self, path: str, symbol: str, exchange: str, checkpoint_interval: int, flush_rows: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.symbol = symbol
+        self.exchange = exchange
+        self.checkpoint_interval = checkpoint_interval
+        self.flush_rows = flush_rows
+        self.counts = {table: 0 for table in _TABLES}
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.counts.update(json.load(f)["counts"])
+        self.buffers = {table: {column: array(code) for column, code in columns.items()}
+                        for table, columns in _TABLES.items()}
+        self.orderbook = Orderbook(symbol)
+        self.synced = False  # checkpoints are only written once a snapshot has been seen
+        self.last_checkpoint = None
+
+    def _append(self, table: str, **values):
+        buffers = self.buffers[table]
+        for column, value in values.items():
+            buffers[column].append(value)
+        self.counts[table] += 1
+
+    def add_orderbook(self, data):
+        ts = data["ts"]
+        bids = [(float(price), float(size)) for price, size in data["data"]["b"]]
+        asks = [(float(price), float(size)) for price, size in data["data"]["a"]]
+        snapshot = data["type"] == "snapshot"
+        message = self.counts["book"]
+        start = self.counts["level"]
+        self._append("book", ts=ts, start=start, asks=start + len(bids), snapshot=snapshot)
+        self._add_levels("level", bids, asks)
+
+        if snapshot:
+            self.orderbook.update(bids, asks, ts)
+            self.synced = True
+        else:
+            self.orderbook.delta_update(bids, asks, ts)
+        if self.synced and (self.last_checkpoint is None or ts - self.last_checkpoint >= self.checkpoint_interval):
+            self._add_checkpoint(ts, message + 1)
+        if len(self.buffers["level"]["price"]) >= self.flush_rows:
+            self.flush()
+
+    def _add_levels(self, table: str, bids, asks):
+        buffers = self.buffers[table]
+        for side, levels in ((BID, bids), (ASK, asks)):
+            for price, size in levels:
+                buffers["side"].append(side)
+                buffers["price"].append(price)
+                buffers["size"].append(size)
+        self.counts[table] += len(bids) + len(asks)
+
+    def _add_checkpoint(self, ts: int, message: int):
+        bids = self.orderbook.top_bids(len(self.orderbook.bids))
+        asks = self.orderbook.top_asks(len(self.orderbook.asks))
+        start = self.counts["checkpoint_level"]
+        self._append("checkpoint", ts=ts, message=message, start=start, asks=start + len(bids))
+        self._add_levels("checkpoint_level", bids, asks)
+        self.last_checkpoint = ts
+
+    def add_trade(self, data):
+        for trade in data["data"]:
+            self._append("trade", ts=trade["T"], side=_SIDES[trade["S"]],
+                         price=float(trade["p"]), size=float(trade["v"]))
+
+    def add_candle(self, data):
+        for candle in data["data"]:
+            interval = candle["interval"]
+            self._append("candle", ts=candle["timestamp"], start=candle["start"], end=candle["end"],
+                         interval=_INTERVALS[interval] if interval in _INTERVALS else int(interval),
+                         open=float(candle["open"]), high=float(candle["high"]), low=float(candle["low"]),
+                         close=float(candle["close"]), volume=float(candle["volume"]),
+                         turnover=float(candle["turnover"]), confirmed=candle["confirm"])
+
+    def add_liquidation(self, data):
+        for liquidation in data["data"]:
+            self._append("liquidation", ts=liquidation["updatedTime"], side=_SIDES[liquidation["side"]],
+                         price=float(liquidation["price"]), size=float(liquidation["size"]))
+
+    def flush(self):
+        for table, buffers in self.buffers.items():
+            for column, buffer in buffers.items():
+                if buffer:
+                    with open(os.path.join(self.path, f"{table}_{column}.bin"), "ab") as f:
+                        buffer.tofile(f)
+                    del buffer[:]
+        meta = {"symbol": self.symbol, "exchange": self.exchange, "counts": self.counts,
+                "checkpoint_interval": self.checkpoint_interval}
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+
+class TickStoreWriter:
+    # Writes raw Bybit messages into per-symbol columnar stores under `root`.
+    # Has the same record(channel, data) interface as Recorder, so it can be
+    # passed directly to BybitHandler(recorder=...).
+    def __init__(self, root: str, exchange: str = "Bybit", checkpoint_interval: int = 60_000, flush_rows: int = 1 << 16):
+        self.root = root
+        self.exchange = exchange
+        self.checkpoint_interval = checkpoint_interval  # ms of exchange time between full-book checkpoints
+        self.flush_rows = flush_rows
+        self.writers: dict[str, _SymbolWriter] = dict()
+
+    def writer(self, symbol: str) -> _SymbolWriter:
+        if symbol not in self.writers:
+            self.writers[symbol] = _SymbolWriter(os.path.join(self.root, symbol), symbol, self.exchange,
+                                                 self.checkpoint_interval, self.flush_rows)
+        return self.writers[symbol]
+
+    def record(self, channel: str, data):
+        symbol = topic_symbol(data["topic"])
+        writer = self.writer(symbol)
+        if channel == "orderbook":
+            writer.add_orderbook(data)
+        elif channel == "trade":
+            writer.add_trade(data)
+        elif channel == "candle":
+            writer.add_candle(data)
+        elif channel == "liquidation":
+            writer.add_liquidation(data)
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        self.flush()
+
+
+def convert_recording(paths: list[str], root: str, exchange: str = "Bybit", checkpoint_interval: int = 60_000):
+    # converts Recorder files into a tick store
+    writer = TickStoreWriter(root, exchange=exchange, checkpoint_interval=checkpoint_interval)
+    for path in paths:
+        for _, channel, data in read_recording(path):
+            writer.record(channel, data)
+    writer.close()
+
+
+class TickStore:
+    # Read-only, zero-copy view over one symbol of a tick store. Every column is
+    # a numpy.memmap, e.g. store.book["ts"] or store.trade["price"].
+    # Timestamps are exchange milliseconds.
+    def __init__(self, root: str, symbol: str):
+        self.path = os.path.join(root, symbol)
+        with open(os.path.join(self.path, "meta.json")) as f:
+            meta = json.load(f)
+        self.symbol = meta["symbol"]
+        self.exchange = meta["exchange"]
+        self.counts = meta["counts"]
+        for table, columns in _TABLES.items():
+            setattr(self, table, {column: self._column(table, column, code) for column, code in columns.items()})
+
+    def _column(self, table: str, column: str, code: str):
+        count = self.counts[table]
+        if count == 0:
+            return np.empty(0, dtype=code)
+        return np.memmap(os.path.join(self.path, f"{table}_{column}.bin"), dtype=code, mode="r", shape=(count,))
+
+    @staticmethod
+    def list_symbols(root: str) -> list[str]:
+        return sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, "meta.json")))
+
+    def book_index(self, timestamp: int) -> int:
+        # index of the first book message after `timestamp`
+        return int(np.searchsorted(self.book["ts"], timestamp, side="right"))
+
+    def levels(self, i: int):
+        # (bid_prices, bid_sizes, ask_prices, ask_sizes) of book message i, as memmap slices
+        start = self.book["start"][i]
+        asks = self.book["asks"][i]
+        end = self.book["start"][i + 1] if i + 1 < self.counts["book"] else self.counts["level"]
+        price, size = self.level["price"], self.level["size"]
+        return price[start:asks], size[start:asks], price[asks:end], size[asks:end]
+
+    def apply(self, orderbook: Orderbook, i: int):
+        # applies book message i to `orderbook` (timestamps in seconds, like the live handlers)
+        bid_prices, bid_sizes, ask_prices, ask_sizes = self.levels(i)
+        bids = zip(bid_prices.tolist(), bid_sizes.tolist())
+        asks = zip(ask_prices.tolist(), ask_sizes.tolist())
+        if self.book["snapshot"][i]:
+            orderbook.update(bids, asks, self.book["ts"][i] / 1000)
+        else:
+            orderbook.delta_update(bids, asks, self.book["ts"][i] / 1000)
+
+    def orderbook_at(self, timestamp: int, orderbook: Orderbook = None) -> tuple[Orderbook, int]:
+        # Rebuilds the book as of `timestamp` from the nearest earlier checkpoint.
+        # Returns the book and the index of the next book message to apply.
+        if orderbook is None:
+            orderbook = Orderbook(self.symbol)
+        end = self.book_index(timestamp)
+        c = int(np.searchsorted(self.checkpoint["message"], end, side="right")) - 1
+        if c >= 0:
+            start = self.checkpoint["start"][c]
+            asks = self.checkpoint["asks"][c]
+            stop = self.checkpoint["start"][c + 1] if c + 1 < self.counts["checkpoint"] else self.counts["checkpoint_level"]
+            price, size = self.checkpoint_level["price"], self.checkpoint_level["size"]
+            orderbook.update(zip(price[start:asks].tolist(), size[start:asks].tolist()),
+                             zip(price[asks:stop].tolist(), size[asks:stop].tolist()),
+                             self.checkpoint["ts"][c] / 1000)
+            i = int(self.checkpoint["message"][c])
+        else:
+            i = 0
+        while i < end:
+            self.apply(orderbook, i)
+            i += 1
+        return orderbook, end
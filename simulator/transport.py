@@ -0,0 +1,151 @@
+import base64
+import hashlib
+import os
+import socket
+import struct
+import threading
+from urllib.parse import urlparse
+
+from .bybit_decoder import loads
+
+# Minimal RFC 6455 websocket framing, enough for talking to the local Bybit
+# stand-in (local_bybit.py): no fragmentation and no extensions.
+
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def accept_key(key: bytes) -> bytes:
+    return base64.b64encode(hashlib.sha1(key + _GUID).digest())
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    n = len(payload)
+    mask = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(mask, "big")).to_bytes(n, "big")
+
+
+def encode_frame(payload: bytes, opcode: int = OP_TEXT, mask: bool = False) -> bytes:
+    # clients must mask their frames, servers must not
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, n)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _apply_mask(payload, key)
+    return header + payload
+
+
+def read_frame(stream) -> tuple[int, bytes]:
+    # (opcode, payload), opcode being None once the stream is closed
+    header = stream.read(2)
+    if len(header) < 2:
+        return None, b""
+    opcode = header[0] & 0x0F
+    n = header[1] & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", stream.read(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", stream.read(8))[0]
+    key = stream.read(4) if header[1] & 0x80 else None
+    payload = stream.read(n)
+    if len(payload) < n:
+        return None, b""
+    if key is not None:
+        payload = _apply_mask(payload, key)
+    return opcode, payload
+
+
+class LocalTransport:
+    # Websocket client with the subscription methods BybitHandler uses on pybit's
+    # WebSocket, for BybitHandler(transport=LocalTransport(url)). Callbacks are
+    # called with the decoded message from the transport's reader thread, like
+    # pybit does.
+    def __init__(self, url: str = "ws://127.0.0.1:8765/v5/public/linear"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/"
+        self._callbacks = dict()  # topic -> callback
+        self._socket = None
+        self._stream = None
+        self._send_lock = threading.Lock()
+        self._reader = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = base64.b64encode(os.urandom(16))
+        sock.sendall(b"GET %s HTTP/1.1\r\nHost: %s:%d\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n"
+                     % (self.path.encode(), self.host.encode(), self.port, key))
+        stream = sock.makefile("rb")
+        status = stream.readline()
+        headers = dict()
+        while True:
+            line = stream.readline().strip()
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+        if b" 101 " not in status or headers.get(b"sec-websocket-accept") != accept_key(key):
+            sock.close()
+            raise ConnectionError(f"websocket handshake with {self.host}:{self.port} failed: {status!r}")
+        self._socket = sock
+        self._stream = stream
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _send(self, payload: bytes, opcode: int = OP_TEXT):
+        with self._send_lock:
+            self._socket.sendall(encode_frame(payload, opcode, mask=True))
+
+    def _read_loop(self):
+        callbacks = self._callbacks
+        while True:
+            try:
+                opcode, payload = read_frame(self._stream)
+            except (OSError, ValueError):
+                return
+            if opcode is None or opcode == OP_CLOSE:
+                return
+            if opcode == OP_PING:
+                self._send(payload, OP_PONG)
+            elif opcode == OP_TEXT or opcode == OP_BINARY:
+                data = loads(payload)
+                callback = callbacks.get(data.get("topic"))
+                if callback is not None:
+                    callback(data)
+
+    def subscribe(self, topic: str, callback):
+        self._callbacks[topic] = callback
+        if self._socket is None:
+            self._connect()
+        self._send(b'{"op":"subscribe","args":["%s"]}' % topic.encode())
+
+    def orderbook_stream(self, depth: int, symbol: str, callback):
+        self.subscribe(f"orderbook.{depth}.{symbol}", callback)
+
+    def trade_stream(self, symbol: str, callback):
+        self.subscribe(f"publicTrade.{symbol}", callback)
+
+    def liquidation_stream(self, symbol: str, callback):
+        self.subscribe(f"liquidation.{symbol}", callback)
+
+    def kline_stream(self, interval, symbol: str, callback):
+        self.subscribe(f"kline.{interval}.{symbol}", callback)
+
+    def exit(self):
+        if self._socket is not None:
+            try:
+                self._send(b"", OP_CLOSE)
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
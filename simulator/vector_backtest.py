@@ -0,0 +1,161 @@
+import itertools
+
+import numpy as np
+
+from .tick_store import TickStore
+
+# Vectorized backtests for screening simple signal strategies before running
+# them through the event-driven simulator. A strategy is a function of
+# precomputed top-of-book columns returning target positions (one per book
+# event); fills, cash, positions and equity are then computed with array
+# operations for many variants at once.
+#
+# Fills walk the recorded top `levels` of the opposite side at the event the
+# position changes; size beyond the recorded depth is charged at the last
+# recorded level. An extra slippage in basis points and a proportional fee can
+# be added on top.
+
+
+def build_columns(store: TickStore, start: int = None, end: int = None, levels: int = 5,
+                  every_ms: int = None) -> dict[str, np.ndarray]:
+    # Replays the store's book messages between start and end (exchange ms) and
+    # samples the top of book after each one (or at most once every every_ms).
+    if start is None:
+        orderbook, i = store.orderbook_at(-1)
+    else:
+        orderbook, i = store.orderbook_at(start - 1)
+    stop = store.counts["book"] if end is None else store.book_index(end)
+    n = stop - i
+    ts = np.empty(n, dtype=np.int64)
+    bid_prices = np.empty((n, levels))
+    bid_sizes = np.zeros((n, levels))
+    ask_prices = np.empty((n, levels))
+    ask_sizes = np.zeros((n, levels))
+    book_ts = store.book["ts"]
+    rows = 0
+    next_sample = None
+    for message in range(i, stop):
+        store.apply(orderbook, message)
+        timestamp = int(book_ts[message])
+        if orderbook.best_bid is None or orderbook.best_ask is None:
+            continue
+        if every_ms is not None:
+            if next_sample is not None and timestamp < next_sample:
+                continue
+            next_sample = timestamp + every_ms
+        for side_prices, side_sizes, top in ((bid_prices, bid_sizes, orderbook.top_bids(levels)),
+                                             (ask_prices, ask_sizes, orderbook.top_asks(levels))):
+            for level, (price, size) in enumerate(top):
+                side_prices[rows, level] = price
+                side_sizes[rows, level] = size
+            # missing levels repeat the last price with no size
+            side_prices[rows, len(top):] = top[-1][0]
+        ts[rows] = timestamp
+        rows += 1
+
+    columns = {"ts": ts[:rows], "bid_prices": bid_prices[:rows], "bid_sizes": bid_sizes[:rows],
+               "ask_prices": ask_prices[:rows], "ask_sizes": ask_sizes[:rows]}
+    return with_features(columns)
+
+
+def with_features(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    # adds the derived top-of-book columns (best prices/sizes, mid, spread, imbalance)
+    best_bid, best_ask = columns["bid_prices"][:, 0], columns["ask_prices"][:, 0]
+    bid_size, ask_size = columns["bid_sizes"][:, 0], columns["ask_sizes"][:, 0]
+    columns.update(best_bid=best_bid, best_ask=best_ask, bid_size=bid_size, ask_size=ask_size,
+                   mid=(best_bid + best_ask) / 2, spread=best_ask - best_bid,
+                   imbalance=(bid_size - ask_size) / (bid_size + ask_size))
+    return columns
+
+
+def save_columns(path: str, columns: dict[str, np.ndarray]):
+    np.savez(path, **{name: columns[name] for name in ("ts", "bid_prices", "bid_sizes", "ask_prices", "ask_sizes")})
+
+
+def load_columns(path: str) -> dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return with_features({name: data[name] for name in data.files})
+
+
+# signal helpers
+
+def forward_fill(values: np.ndarray, initial: float = 0.0) -> np.ndarray:
+    # replaces NaNs (along the last axis) with the last non-NaN value, `initial` before the first one
+    values = np.asarray(values, dtype=float)
+    padded = np.concatenate([np.full(values.shape[:-1] + (1,), initial), values], axis=-1)
+    index = np.where(np.isnan(padded), 0, np.arange(padded.shape[-1]))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    return np.take_along_axis(padded, index, axis=-1)[..., 1:]
+
+
+def threshold_positions(values: np.ndarray, upper: float, lower: float, size: float = 1.0) -> np.ndarray:
+    # long `size` once values go above upper, short once they go below lower, otherwise hold
+    entries = np.where(values > upper, size, np.where(values < lower, -size, np.nan))
+    return forward_fill(entries)
+
+
+# engine
+
+def execution_prices(columns: dict[str, np.ndarray], times: np.ndarray, quantities: np.ndarray,
+                     slippage_bps: float = 0.0) -> np.ndarray:
+    # average fill price of each signed quantity (buy > 0) at the book event times[k]
+    buy = quantities > 0
+    prices = np.where(buy[:, None], columns["ask_prices"][times], columns["bid_prices"][times])
+    sizes = np.where(buy[:, None], columns["ask_sizes"][times], columns["bid_sizes"][times])
+    quantity = np.abs(quantities)
+    ahead = np.cumsum(sizes, axis=1) - sizes
+    filled = np.clip(quantity[:, None] - ahead, 0, sizes)
+    cost = (filled * prices).sum(axis=1) + (quantity - filled.sum(axis=1)) * prices[:, -1]
+    return cost / quantity * (1 + np.where(buy, slippage_bps, -slippage_bps) / 1e4)
+
+
+def run(columns: dict[str, np.ndarray], targets: np.ndarray, fee: float = 0.0, slippage_bps: float = 0.0,
+        delay: int = 1) -> dict[str, np.ndarray]:
+    # Backtests target positions of shape (events,) or (variants, events).
+    # Positions change `delay` events after the signal (1 by default, so a signal
+    # computed from an event's book cannot trade on that same book).
+    # Returns per-event arrays (variants, events) and per-variant summaries.
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    if delay:
+        targets = np.concatenate([np.zeros((targets.shape[0], delay)), targets[:, :-delay]], axis=1)
+    trades = np.diff(targets, axis=1, prepend=0.0)
+    variant, time = np.nonzero(trades)
+    quantities = trades[variant, time]
+    prices = execution_prices(columns, time, quantities, slippage_bps)
+    notional = np.abs(quantities) * prices
+
+    cash_flows = np.zeros_like(targets)
+    cash_flows[variant, time] = -quantities * prices - fee * notional
+    equity = np.cumsum(cash_flows, axis=1) + targets * columns["mid"]
+
+    returns = np.diff(equity, axis=1)
+    volatility = returns.std(axis=1)
+    variants = targets.shape[0]
+    return {
+        "position": targets,
+        "equity": equity,
+        "pnl": equity[:, -1],
+        "fees": np.bincount(variant, weights=fee * notional, minlength=variants),
+        "trades": np.bincount(variant, minlength=variants),
+        "turnover": np.bincount(variant, weights=notional, minlength=variants),
+        "max_drawdown": (np.maximum.accumulate(equity, axis=1) - equity).max(axis=1),
+        "sharpe": np.divide(returns.mean(axis=1), volatility, out=np.zeros(variants), where=volatility > 0),  # per event
+    }
+
+
+def screen(columns: dict[str, np.ndarray], strategy, grid: dict[str, list], chunk_size: int = 64, **kwargs) -> list[dict]:
+    # Runs strategy(columns, **params) -> target positions for every point of the
+    # grid, `chunk_size` variants per vectorized run, and returns one summary per
+    # variant, best PnL first. kwargs are passed on to run().
+    keys = sorted(grid)
+    points = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    summaries = []
+    for chunk_start in range(0, len(points), chunk_size):
+        chunk = points[chunk_start:chunk_start + chunk_size]
+        result = run(columns, np.stack([strategy(columns, **params) for params in chunk]), **kwargs)
+        for k, params in enumerate(chunk):
+            summaries.append({"params": params, "pnl": float(result["pnl"][k]), "trades": int(result["trades"][k]),
+                              "turnover": float(result["turnover"][k]), "fees": float(result["fees"][k]),
+                              "max_drawdown": float(result["max_drawdown"][k]), "sharpe": float(result["sharpe"][k])})
+    summaries.sort(key=lambda summary: summary["pnl"], reverse=True)
+    return summaries
@@ -0,0 +1,14 @@
+from simulator.audit import AuditWriter
+from simulator.recorder import read_recording
+
+
+def test_flush_after_drops_writes_buffered_events(tmp_path):
+    audit = AuditWriter(str(tmp_path), capacity=10, block=False, flush_interval=60)
+    for i in range(30):
+        audit.record("event", i)
+    audit.flush()
+    assert audit.recorded + audit.dropped == 30
+    assert audit.written == audit.recorded
+    audit.close()
+    rows = [row for path in audit.paths for row in read_recording(path)]
+    assert [data for _, _, data in rows] == list(range(audit.recorded))
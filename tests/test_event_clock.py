@@ -0,0 +1,111 @@
+from simulator.abstract_strategy import AbstractStrategy
+from simulator.event_clock import EventClock
+from simulator.exchange_handler import ExchangeHandler
+from simulator.records import OrderStatus
+
+
+class _Source(ExchangeHandler):
+    # replays (timestamp, kind, callback, args) events given up front
+    def __init__(self, name: str, events: list):
+        super().__init__(name=name, symbols={"BTCUSDT"})
+        self._events = events
+
+    def events(self):
+        return iter(self._events)
+
+
+def test_sources_merge_by_timestamp_with_feed_latency():
+    clock = EventClock(feed_latency={"B": 2})
+    dispatched = []
+
+    def event(name):
+        dispatched.append((clock.now, name))
+        if name == "A1":
+            clock.schedule(4, event, "scheduled")
+
+    clock.add_source("A", [(1, 0, event, ("A1",)), (4, 0, event, ("A4",)), (7, 1, event, ("A7",))])
+    clock.add_source("B", [(0, 0, event, ("B0",)), (3, 0, event, ("B3",)), (5, 0, event, ("B5",))])
+    clock.run()
+    # B is shifted by 2 ms; at equal times scheduled callbacks come first, then by kind (book before trade)
+    assert dispatched == [(1, "A1"), (2, "B0"), (4, "scheduled"), (4, "A4"), (5, "B3"), (7, "B5"), (7, "A7")]
+    assert clock.now is None and clock.pending() == 0
+
+
+def _run(actions: dict, until: int = 10, order_latency: float = 5):
+    # runs a strategy over a book at 99/101 with an event every ms; actions[t](strategy)
+    # is called at time t and its result logged with the time
+    strategy = None
+    log = []
+
+    def tick(timestamp):
+        if timestamp in actions:
+            log.append((timestamp, actions[timestamp](strategy)))
+
+    def book(bids, asks, timestamp):
+        orderbook = handler.orderbook("BTCUSDT")
+        orderbook.update(bids=bids, asks=asks, timestamp=timestamp)
+        strategy._on_orderbook_update("BTCUSDT", handler, orderbook, timestamp)
+
+    events = [(0, 0, book, ([(99, 1)], [(101, 1)], 0))]
+    events += [(t, 1, tick, (t,)) for t in range(1, until)]
+    handler = _Source("Test", events)
+    strategy = AbstractStrategy(exchange_handlers={"Test": handler}, initial_balance=1000,
+                                clock=EventClock(order_latency={"Test": order_latency}))
+    strategy.start()
+    return strategy, log
+
+
+def _resting(strategy) -> set:
+    return set(strategy._resting_orders("BTCUSDT", "Test").orders)
+
+
+def test_limit_order_rests_after_order_latency():
+    orders = []
+
+    def place(strategy):
+        orders.append(strategy.limit_order("BTCUSDT", "Test", "Buy", 1, 100))
+        return orders[-1].status, _resting(strategy)
+
+    def check(strategy):
+        return orders[0].status, _resting(strategy)
+
+    _, log = _run({1: place, 5: check, 6: check})
+    order_id = orders[0].order_id
+    assert log == [(1, (OrderStatus.NEW, set())),  # sent at 1, reaches the book at 6
+                   (5, (OrderStatus.NEW, set())),
+                   (6, (OrderStatus.NEW, {order_id}))]
+
+
+def test_cancel_sent_before_the_order_arrives():
+    orders = []
+
+    def place(strategy):
+        orders.append(strategy.limit_order("BTCUSDT", "Test", "Buy", 1, 100))
+
+    def cancel(strategy):
+        return strategy.cancel_order("BTCUSDT", "Test", orders[0].order_id) is orders[0]
+
+    def check(strategy):
+        return orders[0].status, _resting(strategy)
+
+    _, log = _run({1: place, 2: cancel, 3: check, 6: check, 7: check})
+    order_id = orders[0].order_id
+    # the order reaches the book at 6 and the cancel, sent after it, at 7
+    assert log == [(1, None), (2, True), (3, (OrderStatus.NEW, set())),
+                   (6, (OrderStatus.NEW, {order_id})), (7, (OrderStatus.CANCELLED, set()))]
+
+
+def test_market_order_fills_against_the_book_on_arrival():
+    orders = []
+
+    def buy(strategy):
+        orders.append(strategy.market_order("BTCUSDT", "Test", "Buy", 1))
+        return orders[-1].status
+
+    def move(strategy):
+        strategy.exchange_handlers["Test"].orderbook("BTCUSDT").update(bids=[(100, 1)], asks=[(102, 1)], timestamp=3)
+
+    strategy, log = _run({1: buy, 3: move})
+    assert log[0] == (1, OrderStatus.NEW)
+    assert (orders[0].status, orders[0].price) == (OrderStatus.FILLED, 102)
+    assert strategy.get_balance("Test") == 1000 - 102
@@ -0,0 +1,31 @@
+import random
+
+from simulator.fill_model import QueueFillModel
+from simulator.orderbook import Orderbook
+from simulator.records import Order, OrderStatus, OrderType, Side, TimeInForce
+from simulator.resting_orders import RestingOrders
+
+
+def test_queue_estimates_match_a_full_rescan():
+    rnd = random.Random(0)
+    model = QueueFillModel()
+    orderbook = Orderbook("BTCUSDT")
+    orderbook.update([(100 - i, 5.0) for i in range(1, 21)], [(100 + i, 5.0) for i in range(1, 21)], 0)
+    resting = RestingOrders()
+    for order_id in range(1, 41):
+        side = rnd.choice([Side.BUY, Side.SELL])
+        price = 100 - side * rnd.randint(1, 20)
+        order = Order(price, 1.0, side, "BTCUSDT", "Test", order_id, TimeInForce.GTC, OrderStatus.NEW, OrderType.LIMIT)
+        resting.add(order)
+        model.on_order_added(resting, order, orderbook)
+
+    for step in range(1, 2000):
+        bids = [(100 - rnd.randint(1, 20), rnd.choice([0.0, rnd.random() * 5])) for _ in range(rnd.randint(0, 5))]
+        asks = [(100 + rnd.randint(1, 20), rnd.choice([0.0, rnd.random() * 5])) for _ in range(rnd.randint(0, 5))]
+        orderbook.delta_update(bids, asks, step)
+        expected = {}
+        for order_id, order in resting.orders.items():
+            levels = orderbook.bids if order.side == Side.BUY else orderbook.asks
+            expected[order_id] = min(resting.queue_ahead[order_id], levels.get(order.price, 0.0))
+        model.on_orderbook_update(resting, orderbook)
+        assert resting.queue_ahead == expected
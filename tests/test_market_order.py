@@ -0,0 +1,31 @@
+from simulator.abstract_strategy import AbstractStrategy
+from simulator.exchange_handler import ExchangeHandler
+
+
+def _strategy():
+    handler = ExchangeHandler("Test", {"BTCUSDT"})
+    handler.orderbook("BTCUSDT").update(bids=[(99, 1)], asks=[(101, 1)], timestamp=0)
+    return AbstractStrategy(exchange_handlers={"Test": handler}, initial_balance=1000)
+
+
+def test_take_liquidity_reports_filled_size():
+    strategy = _strategy()
+    orderbook = strategy.exchange_handlers["Test"].orderbook("BTCUSDT")
+    assert orderbook.take_liquidity(5) == (101, 1)
+    assert orderbook.take_liquidity(5) == (None, 0)
+
+
+def test_fill_order_returns_average_price():
+    strategy = _strategy()
+    orderbook = strategy.exchange_handlers["Test"].orderbook("BTCUSDT")
+    assert orderbook.fill_order(0) == 100
+    assert orderbook.fill_order(-5) == 99
+    assert orderbook.fill_order(-5) is None
+
+
+def test_market_order_only_books_filled_size():
+    strategy = _strategy()
+    order = strategy.market_order("BTCUSDT", "Test", "Buy", 5)
+    assert (order.size, order.price) == (1, 101)
+    assert strategy.get_position("BTCUSDT", "Test").size == 1
+    assert strategy.get_balance("Test") == 1000 - 101
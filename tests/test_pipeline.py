@@ -0,0 +1,56 @@
+import random
+import sys
+
+from simulator.abstract_strategy import AbstractStrategy
+from simulator.exchange_handler import ExchangeHandler
+from simulator.pipeline import EventPipeline
+
+
+class _DeltaHandler(ExchangeHandler):
+    # applies random deltas on its own thread, like a websocket handler
+    def __init__(self, count: int):
+        super().__init__(name="Test", symbols={"BTCUSDT"})
+        self.count = count
+
+    def run(self):
+        rnd = random.Random(0)
+        orderbook = self.orderbook("BTCUSDT")
+        with orderbook.lock:
+            orderbook.update([(100 - i, 1.0) for i in range(1, 51)], [(100 + i, 1.0) for i in range(1, 51)], 0)
+        for i in range(1, self.count):
+            bids = [(100 - rnd.randint(1, 50), rnd.choice([0.0, 1.0])) for _ in range(5)]
+            asks = [(100 + rnd.randint(1, 50), rnd.choice([0.0, 1.0])) for _ in range(5)]
+            with orderbook.lock:
+                orderbook.delta_update(bids, asks, i)
+            self.strategy._on_orderbook_update("BTCUSDT", self, orderbook, i)
+
+
+class _Checker(AbstractStrategy):
+    def __init__(self, exchange_handlers):
+        super().__init__(exchange_handlers=exchange_handlers, initial_balance=1e9)
+        self.updates = 0
+        self.errors = []
+
+    def on_orderbook_update(self, symbol, exchange, orderbook, timestamp):
+        self.updates += 1
+        if timestamp != orderbook.last_update_time:
+            self.errors.append(("timestamp", timestamp, orderbook.last_update_time))
+        if sorted(orderbook.bids) != orderbook._bid_prices or sorted(-price for price in orderbook.asks) != orderbook._ask_keys:
+            self.errors.append(("levels", timestamp))
+        if orderbook.last_update_time != timestamp:  # the book must not change during the callback
+            self.errors.append(("changed", timestamp, orderbook.last_update_time))
+        if self.updates % 10 == 0 and orderbook.best_ask is not None:
+            self.market_order(symbol, exchange.name, "Buy", 0.5)
+
+
+def test_dispatch_sees_consistent_books():
+    handler = _DeltaHandler(20_000)
+    strategy = _Checker({"Test": handler})
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        EventPipeline(strategy, maxsize=100).start(until_exhausted=True)
+    finally:
+        sys.setswitchinterval(interval)
+    assert strategy.updates > 0
+    assert strategy.errors == []
@@ -0,0 +1,29 @@
+from simulator.recorder import Recorder
+from simulator.replay_handler import ReplayHandler
+
+
+def _book(ts: int) -> dict:
+    return {"topic": "orderbook.50.BTCUSDT", "type": "snapshot", "ts": ts,
+            "data": {"s": "BTCUSDT", "b": [["99", "1"]], "a": [["101", "1"]], "u": 1, "seq": 1}}
+
+
+def _trade(ts: int, symbol: str = "BTCUSDT") -> dict:
+    return {"topic": f"publicTrade.{symbol}", "type": "snapshot", "ts": ts,
+            "data": [{"T": ts, "s": symbol, "S": "Buy", "v": "1", "p": "100", "i": "1"}]}
+
+
+def test_events_are_in_timestamp_order(tmp_path):
+    # topics arrive out of exchange time order relative to each other, and one
+    # book timestamp goes back within its own topic
+    path = str(tmp_path / "recording.jsonl.gz")
+    recorder = Recorder(path)
+    for channel, data in [("trade", _trade(5)), ("orderbook", _book(3)), ("trade", _trade(6)),
+                          ("orderbook", _book(7)), ("orderbook", _book(6)), ("trade", _trade(1, "ETHUSDT")),
+                          ("trade", _trade(8))]:
+        recorder.record(channel, data)
+    recorder.close()
+
+    handler = ReplayHandler([path], symbols={"BTCUSDT"})
+    events = [(ts, args[0]["topic"]) for ts, _, _, args in handler.events()]
+    assert events == [(3, "orderbook.50.BTCUSDT"), (5, "publicTrade.BTCUSDT"), (6, "publicTrade.BTCUSDT"),
+                      (7, "orderbook.50.BTCUSDT"), (7, "orderbook.50.BTCUSDT"), (8, "publicTrade.BTCUSDT")]
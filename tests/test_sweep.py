@@ -0,0 +1,10 @@
+import pytest
+
+from simulator.sweep import run_sweep
+
+
+def test_sweep_without_symbols_rejects_empty_store(tmp_path):
+    results_path = tmp_path / "results.csv"
+    with pytest.raises(ValueError):
+        run_sweep(object, {"threshold": [1]}, str(tmp_path), results_path=str(results_path))
+    assert not results_path.exists()
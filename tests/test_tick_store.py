@@ -0,0 +1,53 @@
+import random
+
+from simulator.abstract_strategy import AbstractStrategy
+from simulator.replay_handler import StoreReplayHandler
+from simulator.tick_store import TickStore, TickStoreWriter
+
+
+def _write_store(root: str, count: int = 2000, seed: int = 0):
+    # a snapshot, then a delta every 10 ms; checkpoints every second
+    rnd = random.Random(seed)
+    writer = TickStoreWriter(root, checkpoint_interval=1000)
+    levels = range(1, 201)
+    writer.record("orderbook", {"topic": "orderbook.200.BTCUSDT", "type": "snapshot", "ts": 0,
+                                "data": {"s": "BTCUSDT", "b": [[str(1000 - i), "1"] for i in levels],
+                                         "a": [[str(1000 + i), "1"] for i in levels]}})
+    for n in range(1, count):
+        bids = [[str(1000 - rnd.choice(levels)), str(rnd.choice((0, rnd.randint(1, 9))))] for _ in range(3)]
+        asks = [[str(1000 + rnd.choice(levels)), str(rnd.choice((0, rnd.randint(1, 9))))] for _ in range(3)]
+        writer.record("orderbook", {"topic": "orderbook.200.BTCUSDT", "type": "delta", "ts": n * 10,
+                                    "data": {"s": "BTCUSDT", "b": bids, "a": asks}})
+    writer.close()
+
+
+class _Books(AbstractStrategy):
+    def __init__(self, exchange_handlers):
+        super().__init__(exchange_handlers=exchange_handlers)
+        self.books = []
+
+    def on_orderbook_update(self, symbol, exchange, orderbook, timestamp):
+        self.books.append((timestamp, dict(orderbook.bids), dict(orderbook.asks)))
+
+
+def _replay(root: str, start: int = None) -> list:
+    strategy = _Books({"Bybit": StoreReplayHandler(root, {"BTCUSDT"}, start=start)})
+    strategy.start()
+    return strategy.books
+
+
+def test_replay_from_the_middle_matches_full_replay(tmp_path):
+    root = str(tmp_path)
+    _write_store(root)
+    store = TickStore(root, "BTCUSDT")
+    full = _replay(root)
+    # right after a checkpoint, between two checkpoints and right before one
+    for start in (12_005, 12_345, 15_995):
+        assert store.checkpoint["ts"][0] < start < store.checkpoint["ts"][-1]
+        seeked = _replay(root, start)
+        assert seeked == [book for book in full if book[0] >= start / 1000]
+
+        orderbook, i = store.orderbook_at(start)
+        timestamp, bids, asks = [book for book in full if book[0] <= start / 1000][-1]
+        assert (orderbook.bids, orderbook.asks, orderbook.last_update_time) == (bids, asks, timestamp)
+        assert store.book["ts"][i] > start